@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from social.follow_graph import follower_ids, following_ids
+
 
 class IsOwnerOrReadOnly(BasePermission):
 
@@ -18,12 +20,8 @@ class IsOwnerOrFollower(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return (
-                obj.owner == request.user
-                or request.user.id in obj.followers.values_list(
-                    "owner", flat=True
-                )
-                or request.user.id in obj.following.values_list(
-                    "owner", flat=True
-                )
+                obj.owner_id == request.user.id
+                or request.user.id in follower_ids(obj.owner_id)
+                or request.user.id in following_ids(obj.owner_id)
             )
         return obj.owner == request.user
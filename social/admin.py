@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from social.models import Post, SocialLink, UserProfile
+from social.models import Follow, Post, SocialLink, UserProfile
 
 
 admin.site.register(UserProfile)
 admin.site.register(SocialLink)
 admin.site.register(Post)
+admin.site.register(Follow)
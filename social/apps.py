@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SocialConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "social"
+
+    def ready(self) -> None:
+        import social.feed_cache  # noqa: F401
+        import social.follow_graph  # noqa: F401
+        import social.media  # noqa: F401
+        import social.search  # noqa: F401
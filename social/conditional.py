@@ -0,0 +1,118 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.pagination import LimitOffsetPagination
+
+from social.pagination import KeysetCursorPagination
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+class ConditionalGetMixin:
+    """Answer ``If-None-Match`` on list and retrieve with 304"""
+
+    # Counters and count annotations that change without ``updated_at``.
+    conditional_fields = ()
+
+    def get_conditional_fields(self):
+        return self.conditional_fields
+
+    def get_embedded_validators(self, queryset) -> dict:
+        """Aggregates of related rows embedded in the ``queryset`` rows"""
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        validators = self._list_validators(request)
+        return self._conditional(
+            validators, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self._retrieve_validators(request, kwargs)
+        return self._conditional(
+            validators, super().retrieve, request, *args, **kwargs
+        )
+
+    def _conditional(self, validators, render, request, *args, **kwargs):
+        if validators is None:
+            return render(request, *args, **kwargs)
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            # Informational only: counters change without updated_at.
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(
+                    last_modified.timestamp()
+                )
+        return response
+
+    def _list_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        total = None
+        if isinstance(paginator, KeysetCursorPagination):
+            page = paginator.page_queryset(queryset, request, view=self)
+        elif isinstance(paginator, LimitOffsetPagination):
+            limit = paginator.get_limit(request)
+            offset = paginator.get_offset(request)
+            page = None if limit is None else queryset[offset:offset + limit]
+            # Offset pages also report the total number of rows.
+            total = None if page is None else queryset.count()
+        else:
+            page = None
+        if page is None:
+            return None
+
+        aggregates = {
+            "rows": Count("pk"),
+            "ids": Sum("pk"),
+            "last_modified": Max("updated_at"),
+        }
+        for field in self.get_conditional_fields():
+            aggregates[field] = Sum(field)
+        row = page.aggregate(**aggregates)
+        embedded = self.get_embedded_validators(page)
+        etag = _etag(
+            request.user.id,
+            request.get_full_path(),
+            total,
+            sorted(row.items()),
+            sorted(embedded.items()),
+        )
+        return etag, row["last_modified"]
+
+    def _retrieve_validators(self, request, kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            row = queryset.filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            ).values(
+                "pk", "owner_id", "updated_at", *self.get_conditional_fields()
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if row is None:
+            return None
+        # Safe-method permissions only look at the owner, so a bare
+        # instance is enough to keep 304s behind the same access rules.
+        self.check_object_permissions(
+            request, queryset.model(pk=row["pk"], owner_id=row["owner_id"])
+        )
+        embedded = self.get_embedded_validators(
+            queryset.filter(pk=row["pk"])
+        )
+        etag = _etag(
+            request.user.id, sorted(row.items()), sorted(embedded.items())
+        )
+        return etag, row["updated_at"]
@@ -0,0 +1,190 @@
+import hashlib
+import time
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from social.follow_graph import following_ids
+from social.models import Comment, Follow, Like, Post, UserProfile
+from social.signals import post_published, post_reacted
+
+# Cache hits, stale hits and misses of this process.
+stats = Counter()
+
+
+def _author_key(user_id) -> str:
+    return f"feed:author:{user_id}:version"
+
+
+def _reader_key(user_id) -> str:
+    return f"feed:reader:{user_id}:version"
+
+
+def _new_version() -> str:
+    return uuid4().hex
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(repr(value).encode()).hexdigest()
+
+
+def _versions(keys) -> list:
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def _bump(keys) -> None:
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {key: _new_version() for key in keys}, timeout=None
+        )
+    )
+
+
+def invalidate_authors(*user_ids) -> None:
+    """Expire cached feeds containing posts of ``user_ids`` on commit"""
+    _bump([_author_key(user_id) for user_id in user_ids])
+
+
+def invalidate_readers(*user_ids) -> None:
+    """Expire the cached feeds of ``user_ids`` on commit"""
+    _bump([_reader_key(user_id) for user_id in user_ids])
+
+
+def _cached_response(request, entry) -> Response:
+    response = get_conditional_response(request, etag=entry["etag"])
+    if response is None:
+        response = Response(entry["data"])
+    for header in ("ETag", "Last-Modified"):
+        if entry[header.lower()]:
+            response[header] = entry[header.lower()]
+    return response
+
+
+def _page_keys(request) -> tuple:
+    """Cache keys of the current and the last rendered copy of a page"""
+    user_id = request.user.id
+    authors = sorted(following_ids(user_id) | {user_id})
+    versions = _versions(
+        [_reader_key(user_id)] + [_author_key(author) for author in authors]
+    )
+    path = _digest(request.get_full_path())
+    return (
+        f"feed:{user_id}:{path}:{_digest(versions)}",
+        f"feed:{user_id}:{path}:stale",
+    )
+
+
+def _wait_for_render(key, lock_key) -> tuple:
+    """
+    Re-read ``key`` while another request renders it; return
+    ``(acquired, entry)`` once it is cached or its lock is free to take
+    """
+    deadline = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.FEED_CACHE_LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return False, entry
+        if cache.add(
+            lock_key, True, timeout=settings.FEED_CACHE_LOCK_TIMEOUT
+        ):
+            return True, None
+    return False, None
+
+
+def cached_feed(request, render):
+    """Serve ``render()``'s feed page for ``request`` through the cache"""
+    key, stale_key = _page_keys(request)
+    entry = cache.get(key)
+    if entry is not None:
+        stats["hits"] += 1
+        return _cached_response(request, entry)
+
+    # Only the lock holder renders a miss; the others get the last copy
+    # or wait for the holder's.
+    lock_key = f"{key}:lock"
+    acquired = cache.add(
+        lock_key, True, timeout=settings.FEED_CACHE_LOCK_TIMEOUT
+    )
+    if not acquired:
+        entry = cache.get(stale_key)
+        if entry is not None:
+            stats["stale"] += 1
+            return _cached_response(request, entry)
+        acquired, entry = _wait_for_render(key, lock_key)
+        if entry is not None:
+            stats["hits"] += 1
+            return _cached_response(request, entry)
+
+    stats["misses"] += 1
+    try:
+        response = render()
+        if response.status_code == 200:
+            entry = {
+                "data": response.data,
+                "etag": response.get("ETag"),
+                "last-modified": response.get("Last-Modified"),
+            }
+            cache.set(key, entry, timeout=settings.FEED_CACHE_TIMEOUT)
+            cache.set(
+                stale_key, entry, timeout=settings.FEED_CACHE_STALE_TIMEOUT
+            )
+    finally:
+        # Only the request that set the lock may free it.
+        if acquired:
+            cache.delete(lock_key)
+    return response
+
+
+def _post_owner_id(post_id):
+    return Post.objects.filter(pk=post_id).values_list(
+        "owner_id", flat=True
+    ).first()
+
+
+@receiver(post_published, sender=Post)
+def _on_post_published(sender, owner_id, **kwargs) -> None:
+    invalidate_authors(owner_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def _on_post_changed(sender, instance, **kwargs) -> None:
+    invalidate_authors(instance.owner_id)
+
+
+@receiver(post_reacted, sender=Like)
+def _on_post_reacted(sender, post_id, **kwargs) -> None:
+    owner_id = _post_owner_id(post_id)
+    if owner_id is not None:
+        invalidate_authors(owner_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def _on_comment_changed(sender, instance, **kwargs) -> None:
+    owner_id = _post_owner_id(instance.post_id)
+    if owner_id is not None:
+        invalidate_authors(owner_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def _on_follow_changed(sender, instance, **kwargs) -> None:
+    follower_id = UserProfile.objects.filter(
+        pk=instance.follower_id
+    ).values_list("owner_id", flat=True).first()
+    if follower_id is not None:
+        invalidate_readers(follower_id)
@@ -0,0 +1,82 @@
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social.models import Follow, UserProfile
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+# Cache hits and misses of this process.
+stats = Counter()
+
+
+def _version_key(user_id) -> str:
+    return f"follow-graph:{user_id}:version"
+
+
+def _ids_key(user_id, kind, version) -> str:
+    return f"follow-graph:{user_id}:{kind}:{version}"
+
+
+def _new_version() -> str:
+    return uuid4().hex
+
+
+def _query_ids(user_id, kind) -> set:
+    if kind == FOLLOWING:
+        edges = Follow.objects.filter(follower__owner_id=user_id)
+        column = "followee__owner_id"
+    else:
+        edges = Follow.objects.filter(followee__owner_id=user_id)
+        column = "follower__owner_id"
+    return set(edges.values_list(column, flat=True))
+
+
+def _cached_ids(user_id, kind) -> set:
+    version = cache.get_or_set(
+        _version_key(user_id), _new_version, timeout=None
+    )
+    key = _ids_key(user_id, kind, version)
+    ids = cache.get(key)
+    if ids is not None:
+        stats["hits"] += 1
+        return ids
+    stats["misses"] += 1
+    ids = _query_ids(user_id, kind)
+    cache.set(key, ids, timeout=settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+    return ids
+
+
+def following_ids(user_id) -> set:
+    """Ids of the users that ``user_id`` follows"""
+    return _cached_ids(user_id, FOLLOWING)
+
+
+def follower_ids(user_id) -> set:
+    """Ids of the users following ``user_id``"""
+    return _cached_ids(user_id, FOLLOWERS)
+
+
+def invalidate(*user_ids) -> None:
+    """Drop cached follow sets of ``user_ids`` by bumping their version"""
+    cache.set_many(
+        {_version_key(user_id): _new_version() for user_id in user_ids},
+        timeout=None,
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def _on_follow_changed(sender, instance, **kwargs) -> None:
+    user_ids = list(
+        UserProfile.objects.filter(
+            pk__in=(instance.follower_id, instance.followee_id)
+        ).values_list("owner_id", flat=True)
+    )
+    transaction.on_commit(lambda: invalidate(*user_ids))
@@ -0,0 +1,59 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from social.storage import media_storage
+
+EXTENSIONS = {
+    "webp": "webp",
+    "jpeg": "jpg",
+}
+
+
+def renditions_field(field_name) -> str:
+    return f"{field_name}_renditions"
+
+
+def _encode(image, image_format) -> bytes:
+    if image_format == "jpeg" and image.mode != "RGB":
+        # JPEG has no alpha channel: flatten transparency onto white.
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    buffer = BytesIO()
+    # Nothing passes ``exif=``, so no metadata is written.
+    image.save(
+        buffer,
+        format=image_format.upper(),
+        quality=settings.IMAGE_RENDITION_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def build_renditions(name) -> dict:
+    """Write the renditions of the stored image ``name``, return metadata"""
+    with media_storage.open(name) as source:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert(
+                    "RGBA" if image.has_transparency_data else "RGB"
+                )
+
+    sizes = {}
+    for size, edge in settings.IMAGE_RENDITION_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        rendition = {"width": resized.width, "height": resized.height}
+        for image_format in settings.IMAGE_RENDITION_FORMATS:
+            rendition[image_format] = media_storage.save(
+                f"{size}.{EXTENSIONS[image_format]}",
+                ContentFile(_encode(resized, image_format)),
+            )
+        sizes[size] = rendition
+
+    return {"width": image.width, "height": image.height, "sizes": sizes}
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from social.models import MediaBlob
+from social.storage import media_storage
+
+
+class Command(BaseCommand):
+    """
+    Django command to delete stored media files that are no longer
+    referenced by any post or profile
+    """
+
+    help = "Delete unreferenced media blobs and their files."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep unreferenced blobs touched within this many hours.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of blobs deleted per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the blobs that would be deleted.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        unreferenced = MediaBlob.objects.filter(
+            refcount=0, updated_at__lt=cutoff
+        ).order_by("id")
+
+        if options["dry_run"]:
+            for name in unreferenced.values_list("name", flat=True):
+                self.stdout.write(name)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{unreferenced.count()} blobs would be deleted."
+                )
+            )
+            return
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                # Skip blobs locked by an upload storing the same content.
+                blob_ids = list(
+                    unreferenced.select_for_update(skip_locked=True)
+                    .values_list("id", flat=True)[:options["batch_size"]]
+                )
+                if not blob_ids:
+                    break
+                # Recheck under the lock: a blob referenced meanwhile is
+                # kept together with its file.
+                blobs = dict(
+                    MediaBlob.objects.select_for_update()
+                    .filter(id__in=blob_ids, refcount=0)
+                    .values_list("id", "name")
+                )
+                MediaBlob.objects.filter(id__in=blobs).delete()
+                # Files go while the rows are still locked: uploads of the
+                # same content wait and re-create the file afterwards.
+                for name in blobs.values():
+                    media_storage.delete(name)
+            deleted += len(blobs)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} unreferenced blobs.")
+        )
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from social.models import UserProfile
+from social.timeline import rebuild_timeline, update_fanout_mode
+
+
+class Command(BaseCommand):
+    """Django command to rebuild materialized home timelines from scratch"""
+
+    help = "Rebuild home timelines for all users or the given user ids."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "user_ids",
+            nargs="*",
+            type=int,
+            help="Only rebuild timelines of these users.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        profiles = UserProfile.objects.all()
+        self.stdout.write("Updating fan-out mode of profiles...")
+        for profile in profiles.iterator():
+            update_fanout_mode(profile)
+
+        users = get_user_model().objects.filter(
+            profile__isnull=False
+        ).order_by("id")
+        if options["user_ids"]:
+            users = users.filter(id__in=options["user_ids"])
+
+        rebuilt = entries = 0
+        for user in users.select_related("profile").iterator():
+            entries += rebuild_timeline(user)
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {rebuilt} timelines with {entries} entries."
+            )
+        )
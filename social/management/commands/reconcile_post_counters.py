@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from social.models import Comment, Like, Post
+
+
+def _count_subquery(queryset):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows for the outer post"""
+    counts = (
+        queryset.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    """
+    Django command to backfill and reconcile denormalized post counters
+    (like_count, dislike_count, comment_count) in chunks of post ids
+    """
+
+    help = "Recompute like, dislike and comment counters of posts."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of post ids updated per statement.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Seconds to pause between chunks to throttle the load.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        chunk_size = options["chunk_size"]
+        pause = options["sleep"]
+        last_id = Post.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
+        updated = 0
+        for start in range(0, last_id + 1, chunk_size):
+            updated += Post.objects.filter(
+                id__gte=start, id__lt=start + chunk_size
+            ).update(
+                like_count=_count_subquery(
+                    Like.objects.filter(action=Like.ActionChoices.LIKE)
+                ),
+                dislike_count=_count_subquery(
+                    Like.objects.filter(action=Like.ActionChoices.DISLIKE)
+                ),
+                comment_count=_count_subquery(Comment.objects.all()),
+            )
+            self.stdout.write(
+                f"Reconciled posts up to id {start + chunk_size - 1}"
+            )
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled counters of {updated} posts.")
+        )
@@ -0,0 +1,365 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from social.models import (
+    Comment,
+    Follow,
+    Like,
+    Post,
+    PostHashtag,
+    UserProfile,
+    parse_hashtags,
+)
+from social.seeding import (
+    BulkWriter,
+    HashtagIds,
+    next_id,
+    power_law_weights,
+    read_records,
+    reset_sequences,
+)
+from social.search import post_search_vector
+
+IMPORT_KINDS = ("users", "follows", "posts", "comments", "likes")
+WORDS = (
+    "coffee", "morning", "city", "travel", "music", "weekend", "code",
+    "photo", "sunset", "friends", "book", "running", "garden", "rain",
+    "project", "lunch", "movie", "beach", "mountain", "night",
+)
+
+
+class Command(BaseCommand):
+    """
+    Django command to load a large dataset of users, profiles, follow
+    edges, posts, comments and likes, either generated from a seed or
+    imported from NDJSON/CSV files
+    """
+
+    help = (
+        "Generate or import users, profiles, follows, posts, comments and "
+        "likes in bulk."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--users", type=int, default=1000,
+            help="Number of users (with profiles) to generate.",
+        )
+        parser.add_argument(
+            "--mean-following", type=float, default=20,
+            help="Average number of users each generated user follows.",
+        )
+        parser.add_argument(
+            "--follower-exponent", type=float, default=2.2,
+            help="Exponent of the power-law distribution of followers.",
+        )
+        parser.add_argument(
+            "--posts-per-user", type=float, default=5,
+            help="Average number of posts per generated user.",
+        )
+        parser.add_argument(
+            "--comments-per-post", type=float, default=2,
+            help="Average number of comments per generated post.",
+        )
+        parser.add_argument(
+            "--likes-per-post", type=float, default=5,
+            help="Average number of reactions per generated post.",
+        )
+        parser.add_argument(
+            "--hashtags", type=int, default=200,
+            help="Number of distinct hashtags used by generated posts.",
+        )
+        parser.add_argument(
+            "--days", type=float, default=30,
+            help="Generated posts are published over this many past days.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Random seed; the same seed generates the same dataset.",
+        )
+        parser.add_argument(
+            "--password", default="password",
+            help="Password of users without a password hash.",
+        )
+        parser.add_argument(
+            "--import", dest="imports", nargs=2, action="append",
+            default=[], metavar=("KIND", "PATH"),
+            help=(
+                "Import records of KIND (users, follows, posts, comments, "
+                "likes) from an NDJSON or CSV file instead of generating."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="Number of rows written per statement.",
+        )
+        parser.add_argument(
+            "--no-copy", action="store_true",
+            help="Use bulk_create instead of COPY on PostgreSQL.",
+        )
+        parser.add_argument(
+            "--skip-rebuild", action="store_true",
+            help="Do not reconcile post counters or rebuild timelines.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        imports = dict(options["imports"])
+        unknown = set(imports) - set(IMPORT_KINDS)
+        if unknown:
+            raise CommandError(
+                f"Unknown import kinds: {', '.join(sorted(unknown))}."
+            )
+
+        self.now = timezone.now()
+        # One hash for every user: hashing per row would dominate the load.
+        self.password = make_password(options["password"])
+        self.hashtag_ids = HashtagIds()
+        self._open_writers(
+            options["batch_size"],
+            connection.vendor == "postgresql" and not options["no_copy"],
+        )
+
+        if imports:
+            self._import(imports)
+        else:
+            self._generate(options, random.Random(options["seed"]))
+        for writer in self.writers:
+            writer.flush()
+        reset_sequences([writer.model for writer in self.writers])
+        self._update_search_vectors(options["batch_size"])
+
+        if not options["skip_rebuild"]:
+            call_command(
+                "reconcile_post_counters", sleep=0, stdout=self.stdout
+            )
+            call_command("rebuild_timelines", stdout=self.stdout)
+
+        summary = ", ".join(
+            f"{writer.written} {writer.model._meta.verbose_name_plural}"
+            for writer in self.writers
+        )
+        self.stdout.write(self.style.SUCCESS(f"Loaded {summary}."))
+
+    def _open_writers(self, batch_size, use_copy) -> None:
+        def writer(model, *depends):
+            return BulkWriter(model, batch_size, self.now, use_copy, depends)
+
+        User = get_user_model()
+        self.users = writer(User)
+        self.profiles = writer(UserProfile, self.users)
+        self.follows = writer(Follow, self.profiles)
+        self.posts = writer(Post, self.users)
+        self.post_hashtags = writer(PostHashtag, self.posts)
+        self.comments = writer(Comment, self.posts)
+        self.likes = writer(Like, self.posts)
+        self.writers = [
+            self.users,
+            self.profiles,
+            self.follows,
+            self.posts,
+            self.post_hashtags,
+            self.comments,
+            self.likes,
+        ]
+        self.first_user_id = next_id(User)
+        self.first_profile_id = next_id(UserProfile)
+        self.first_post_id = next_id(Post)
+
+    def _add_user(self, index, values) -> None:
+        user_id = self.first_user_id + index
+        self.users.add(
+            id=user_id,
+            email=values.get("email") or f"seed{user_id}@example.com",
+            username=values.get("username") or f"seed{user_id}",
+            first_name=values.get("first_name", ""),
+            last_name=values.get("last_name", ""),
+            password=values.get("password") or self.password,
+            date_joined=self.now,
+        )
+        self.profiles.add(
+            id=self.first_profile_id + index,
+            owner_id=user_id,
+            bio=values.get("bio", ""),
+            location=values.get("location"),
+        )
+
+    def _add_post(self, index, owner_id, publish_at, values) -> int:
+        post_id = self.first_post_id + index
+        hashtags = values.get("hashtags", "")
+        self.posts.add(
+            id=post_id,
+            owner_id=owner_id,
+            title=values.get("title", ""),
+            text=values.get("text"),
+            hashtags=hashtags,
+            publish_at=publish_at,
+            published=publish_at <= self.now,
+        )
+        for hashtag_id in self.hashtag_ids(parse_hashtags(hashtags)):
+            self.post_hashtags.add(post_id=post_id, hashtag_id=hashtag_id)
+        return post_id
+
+    def _generate(self, options, rng) -> None:
+        count = options["users"]
+        if count < 2:
+            raise CommandError("Generate at least 2 users.")
+        for index in range(count):
+            self._add_user(index, {})
+
+        self.stdout.write("Generating follow edges...")
+        popularity = power_law_weights(
+            count, options["follower_exponent"], rng
+        )
+        users = range(count)
+        for follower in users:
+            following = round(rng.expovariate(1 / options["mean_following"]))
+            followees = set(
+                rng.choices(users, cum_weights=popularity, k=following)
+            )
+            followees.discard(follower)
+            for followee in sorted(followees):
+                self.follows.add(
+                    follower_id=self.first_profile_id + follower,
+                    followee_id=self.first_profile_id + followee,
+                )
+
+        self.stdout.write("Generating posts, comments and likes...")
+        tags = [f"tag{index}" for index in range(options["hashtags"])]
+        tag_weights = power_law_weights(len(tags), 2, rng) if tags else []
+        span = timedelta(days=options["days"]).total_seconds()
+        post_index = 0
+        for owner in users:
+            posts = round(rng.expovariate(1 / options["posts_per_user"]))
+            for _ in range(posts):
+                picked = rng.choices(
+                    tags, cum_weights=tag_weights, k=rng.randint(0, 3)
+                ) if tags else []
+                post_id = self._add_post(
+                    post_index,
+                    self.first_user_id + owner,
+                    self.now - timedelta(seconds=rng.uniform(0, span)),
+                    {
+                        "title": " ".join(rng.choices(WORDS, k=3)),
+                        "text": " ".join(
+                            rng.choices(WORDS, k=rng.randint(5, 30))
+                        ),
+                        "hashtags": " ".join(f"#{tag}" for tag in picked),
+                    },
+                )
+                post_index += 1
+                self._generate_reactions(post_id, count, options, rng)
+
+    def _generate_reactions(self, post_id, count, options, rng) -> None:
+        comments = round(rng.expovariate(1 / options["comments_per_post"]))
+        for _ in range(comments):
+            self.comments.add(
+                post_id=post_id,
+                user_id=self.first_user_id + rng.randrange(count),
+                text=" ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+            )
+        likes = min(
+            count, round(rng.expovariate(1 / options["likes_per_post"]))
+        )
+        for user in sorted(rng.sample(range(count), likes)):
+            action = (
+                Like.ActionChoices.LIKE
+                if rng.random() < 0.85
+                else Like.ActionChoices.DISLIKE
+            )
+            self.likes.add(
+                post_id=post_id,
+                user_id=self.first_user_id + user,
+                action=action,
+            )
+
+    def _import(self, imports) -> None:
+        users = {}
+        posts = {}
+
+        def lookup(ids, record, key, kind):
+            try:
+                return ids[int(record[key])]
+            except (KeyError, ValueError):
+                raise CommandError(
+                    f"Unknown {key} {record.get(key)!r} in {kind}."
+                )
+
+        for kind in IMPORT_KINDS:
+            if kind not in imports:
+                continue
+            self.stdout.write(f"Importing {kind}...")
+            seen = set()
+            for record in read_records(imports[kind]):
+                if kind == "users":
+                    users[int(record["id"])] = index = len(users)
+                    self._add_user(index, record)
+                elif kind == "follows":
+                    edge = (
+                        lookup(users, record, "follower", kind),
+                        lookup(users, record, "followee", kind),
+                    )
+                    if edge[0] == edge[1] or edge in seen:
+                        continue
+                    seen.add(edge)
+                    self.follows.add(
+                        follower_id=self.first_profile_id + edge[0],
+                        followee_id=self.first_profile_id + edge[1],
+                    )
+                elif kind == "posts":
+                    posts[int(record["id"])] = index = len(posts)
+                    self._add_post(
+                        index,
+                        self.first_user_id
+                        + lookup(users, record, "owner", kind),
+                        self._parse_datetime(record.get("publish_at")),
+                        record,
+                    )
+                else:
+                    post_id = self.first_post_id + lookup(
+                        posts, record, "post", kind
+                    )
+                    user_id = self.first_user_id + lookup(
+                        users, record, "user", kind
+                    )
+                    if kind == "comments":
+                        self.comments.add(
+                            post_id=post_id,
+                            user_id=user_id,
+                            text=record.get("text", ""),
+                        )
+                    elif (post_id, user_id) not in seen:
+                        seen.add((post_id, user_id))
+                        self.likes.add(
+                            post_id=post_id,
+                            user_id=user_id,
+                            action=record.get(
+                                "action", Like.ActionChoices.LIKE
+                            ),
+                        )
+
+    def _parse_datetime(self, value):
+        if not value:
+            return self.now
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid publish_at {value!r} in posts.")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _update_search_vectors(self, batch_size) -> None:
+        if connection.vendor != "postgresql" or not self.posts.written:
+            return
+        last_id = self.first_post_id + self.posts.written
+        for start in range(self.first_post_id, last_id, batch_size):
+            Post.objects.filter(
+                id__gte=start, id__lt=min(start + batch_size, last_id)
+            ).update(search_vector=post_search_vector())
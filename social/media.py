@@ -0,0 +1,100 @@
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import post_init, post_save, pre_delete
+
+from social.images import renditions_field
+from social.models import MediaBlob, Post, UserProfile
+
+# Files of these fields and their renditions are reference counted on
+# save and delete; writes bypassing save() must call acquire/release.
+MEDIA_FIELDS = {
+    Post: ("image",),
+    UserProfile: ("profile_picture",),
+}
+
+
+def rendition_names(renditions) -> set:
+    """Stored file names listed in a renditions metadata dict"""
+    return {
+        name
+        for rendition in (renditions or {}).get("sizes", {}).values()
+        for key, name in rendition.items()
+        if key not in ("width", "height")
+    }
+
+
+def _media_attnames(model) -> list:
+    attnames = []
+    for field_name in MEDIA_FIELDS[model]:
+        attnames.extend((field_name, renditions_field(field_name)))
+    return attnames
+
+
+def media_names(instance) -> set:
+    names = set()
+    for field_name in MEDIA_FIELDS[type(instance)]:
+        names.add(getattr(instance, field_name).name)
+        names |= rendition_names(
+            getattr(instance, renditions_field(field_name))
+        )
+    names.discard(None)
+    names.discard("")
+    return names
+
+
+def acquire(names) -> None:
+    """Add one reference to each of ``names``"""
+    if not names:
+        return
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for name in names], ignore_conflicts=True
+    )
+    MediaBlob.objects.filter(name__in=names).update(
+        refcount=F("refcount") + 1, updated_at=Now()
+    )
+
+
+def release(names) -> None:
+    """Drop one reference from each of ``names``"""
+    if not names:
+        return
+    MediaBlob.objects.filter(name__in=names).update(
+        refcount=Greatest(F("refcount") - 1, 0), updated_at=Now()
+    )
+
+
+def _remember(instance) -> None:
+    # Instances loaded without their media columns cannot be diffed.
+    deferred = instance.get_deferred_fields()
+    if any(name in deferred for name in _media_attnames(type(instance))):
+        instance._media_names = None
+    else:
+        instance._media_names = media_names(instance)
+
+
+def _on_init(sender, instance, **kwargs) -> None:
+    _remember(instance)
+
+
+def _on_save(sender, instance, created, **kwargs) -> None:
+    previous = set() if created else instance._media_names
+    if previous is None:
+        return
+    current = media_names(instance)
+    acquire(current - previous)
+    release(previous - current)
+    instance._media_names = current
+
+
+def _on_delete(sender, instance, **kwargs) -> None:
+    if instance._media_names is None:
+        instance = sender.objects.get(pk=instance.pk)
+    release(instance._media_names)
+
+
+for model in MEDIA_FIELDS:
+    post_init.connect(_on_init, sender=model, dispatch_uid=f"media-{model}")
+    post_save.connect(_on_save, sender=model, dispatch_uid=f"media-{model}")
+    pre_delete.connect(
+        _on_delete, sender=model, dispatch_uid=f"media-{model}"
+    )
@@ -0,0 +1,62 @@
+import re
+
+from django.db import migrations
+
+HASHTAG_RE = re.compile(r"#?(\w+)")
+HASHTAG_MAX_LENGTH = 100
+BATCH_SIZE = 1000
+
+
+def parse_hashtags(value):
+    tags = []
+    for tag in HASHTAG_RE.findall(value or ""):
+        tag = tag.lower()
+        if len(tag) <= HASHTAG_MAX_LENGTH and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def backfill_hashtags(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    Hashtag = apps.get_model("social", "Hashtag")
+    PostHashtag = apps.get_model("social", "PostHashtag")
+
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(id__gt=last_id)
+            .exclude(hashtags="")
+            .order_by("id")
+            .values_list("id", "hashtags")[:BATCH_SIZE]
+        )
+        if not posts:
+            break
+        last_id = posts[-1][0]
+
+        post_tags = [(post_id, parse_hashtags(value)) for post_id, value in posts]
+        names = {name for _, tags in post_tags for name in tags}
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name) for name in names], ignore_conflicts=True
+        )
+        hashtag_ids = dict(
+            Hashtag.objects.filter(name__in=names).values_list("name", "id")
+        )
+        PostHashtag.objects.bulk_create(
+            [
+                PostHashtag(post_id=post_id, hashtag_id=hashtag_ids[name])
+                for post_id, tags in post_tags
+                for name in tags
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0027_hashtag"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_hashtags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:32
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Max
+
+from social.migration_operations import PostgresOnly
+
+BATCH_SIZE = 1000
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Post = apps.get_model("social", "Post")
+    vector = SearchVector(
+        "title", weight="A", config=settings.SEARCH_CONFIG
+    ) + SearchVector("text", weight="B", config=settings.SEARCH_CONFIG)
+    last_id = Post.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Post.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(
+            search_vector=vector
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0028_backfill_hashtags"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        PostgresOnly(
+            migrations.RunSQL(
+                "CREATE INDEX IF NOT EXISTS post_search_vector_idx "
+                "ON social_post USING gin (search_vector);",
+                "DROP INDEX IF EXISTS post_search_vector_idx;",
+            )
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:32
+
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from social.migration_operations import PostgresOnly
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0029_post_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Index UPPER(column): the expression Django emits for icontains.
+        PostgresOnly(
+            migrations.RunSQL(
+                "CREATE INDEX IF NOT EXISTS comment_text_trgm_idx "
+                "ON social_comment USING gin (UPPER(text) gin_trgm_ops);",
+                "DROP INDEX IF EXISTS comment_text_trgm_idx;",
+            )
+        ),
+        PostgresOnly(
+            migrations.RunSQL(
+                "CREATE INDEX IF NOT EXISTS profile_location_trgm_idx "
+                "ON social_userprofile USING gin (UPPER(location) gin_trgm_ops);",
+                "DROP INDEX IF EXISTS profile_location_trgm_idx;",
+            )
+        ),
+    ]
@@ -0,0 +1,99 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def _copy_edges(Follow, through, reverse):
+    """
+    Copy rows of an old self-referencing M2M table into Follow edges.
+    ``following`` rows map from -> to, ``followers`` rows map to -> from.
+    """
+    last_id = 0
+    while True:
+        rows = list(
+            through.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "from_userprofile_id", "to_userprofile_id")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        edges = [
+            (target, source) if reverse else (source, target)
+            for _, source, target in rows
+            if source != target
+        ]
+        Follow.objects.bulk_create(
+            [
+                Follow(follower_id=follower, followee_id=followee)
+                for follower, followee in edges
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def merge_follow_tables(apps, schema_editor):
+    UserProfile = apps.get_model("social", "UserProfile")
+    Follow = apps.get_model("social", "Follow")
+    _copy_edges(Follow, UserProfile.following.through, reverse=False)
+    _copy_edges(Follow, UserProfile.followers.through, reverse=True)
+
+
+def split_follow_table(apps, schema_editor):
+    UserProfile = apps.get_model("social", "UserProfile")
+    Follow = apps.get_model("social", "Follow")
+    following = UserProfile.following.through
+    followers = UserProfile.followers.through
+    last_id = 0
+    while True:
+        rows = list(
+            Follow.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "follower_id", "followee_id")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        following.objects.bulk_create(
+            [
+                following(from_userprofile_id=follower, to_userprofile_id=followee)
+                for _, follower, followee in rows
+            ],
+            ignore_conflicts=True,
+        )
+        followers.objects.bulk_create(
+            [
+                followers(from_userprofile_id=followee, to_userprofile_id=follower)
+                for _, follower, followee in rows
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0031_follow"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_follow_tables, split_follow_table),
+        migrations.RemoveField(
+            model_name="userprofile",
+            name="followers",
+        ),
+        migrations.RemoveField(
+            model_name="userprofile",
+            name="following",
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="following",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="followers",
+                through="social.Follow",
+                to="social.userprofile",
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def copy_publish_date(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    days = Post.objects.values_list("publish_date", flat=True).distinct()
+    for day in list(days):
+        publish_at = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time.min)
+        )
+        Post.objects.filter(publish_date=day).update(publish_at=publish_at)
+
+
+def copy_publish_at(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "publish_at")[:BATCH_SIZE]
+        )
+        if not posts:
+            break
+        last_id = posts[-1].id
+        for post in posts:
+            post.publish_date = timezone.localdate(post.publish_at)
+        Post.objects.bulk_update(posts, ["publish_date"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0034_like_reaction_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="publish_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="publish_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_publish_date, copy_publish_at),
+        migrations.AlterField(
+            model_name="post",
+            name="publish_at",
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveField(
+            model_name="post",
+            name="publish_date",
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("published", False)),
+                fields=["publish_at"],
+                name="post_pending_publish_at_idx",
+            ),
+        ),
+    ]
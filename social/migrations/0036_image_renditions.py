@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0035_post_publish_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="profile_picture_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
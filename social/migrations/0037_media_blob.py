@@ -0,0 +1,104 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:46
+
+from collections import Counter
+
+import social.models
+import social.storage
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _rendition_names(renditions):
+    return {
+        name
+        for rendition in (renditions or {}).get("sizes", {}).values()
+        for key, name in rendition.items()
+        if key not in ("width", "height")
+    }
+
+
+def count_references(apps, schema_editor):
+    """Create a blob with its reference count for every referenced file"""
+    MediaBlob = apps.get_model("social", "MediaBlob")
+    references = Counter()
+    for model_name, field_name in (
+        ("Post", "image"),
+        ("UserProfile", "profile_picture"),
+    ):
+        model = apps.get_model("social", model_name)
+        rows = (
+            model.objects.exclude(**{field_name: ""})
+            .exclude(**{f"{field_name}__isnull": True})
+            .values_list(field_name, f"{field_name}_renditions")
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        for name, renditions in rows:
+            references.update({name} | _rendition_names(renditions))
+
+    MediaBlob.objects.bulk_create(
+        [
+            MediaBlob(name=name, refcount=refcount)
+            for name, refcount in references.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0036_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=social.storage.ContentAddressedStorage(),
+                upload_to=social.models.post_image_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="profile_picture",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=social.storage.ContentAddressedStorage(),
+                upload_to=social.models.profile_image_path,
+            ),
+        ),
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.PositiveBigIntegerField(null=True)),
+                ("refcount", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("refcount", 0)),
+                        fields=["updated_at"],
+                        name="mediablob_unreferenced_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
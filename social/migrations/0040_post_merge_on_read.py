@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_merged_posts(apps, schema_editor):
+    """Posts of fan-out-on-read authors were never materialized"""
+    Post = apps.get_model("social", "Post")
+    UserProfile = apps.get_model("social", "UserProfile")
+    owners = UserProfile.objects.filter(fanout_on_read=True).values("owner_id")
+    Post.objects.filter(owner_id__in=owners).update(merge_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0039_comment_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="merge_on_read",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_merged_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("merge_on_read", True)),
+                fields=["owner", "created_at", "id"],
+                name="post_merge_on_read_idx",
+            ),
+        ),
+    ]
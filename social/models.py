@@ -1,15 +1,24 @@
 import os
+import re
+import uuid
 from datetime import datetime
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
+from social.storage import media_storage
 from social_media_api import settings
 
 
+PROFILE_IMAGE_DIRECTORY = os.path.join("profile", "images")
+POST_IMAGE_DIRECTORY = os.path.join("post", "images")
+
+
 def profile_image_path(instance, filename):
     _, extension = os.path.splitext(filename)
     upload_datetime = datetime.now().strftime("%Y%m%d%H%M")
     return os.path.join(
-        "profile", "images",
+        PROFILE_IMAGE_DIRECTORY,
         f"{slugify(instance.owner)}" f"--{upload_datetime}{extension}",
     )
 
@@ -18,11 +27,84 @@ def post_image_path(instance, filename):
     _, extension = os.path.splitext(filename)
     upload_datetime = datetime.now().strftime("%Y%m%d%H%M")
     return os.path.join(
-        "post", "images",
+        POST_IMAGE_DIRECTORY,
         f"{slugify(instance.owner)}" f"--{upload_datetime}{extension}",
     )
 
 
+class MediaBlob(models.Model):
+    """
+    A file in the content-addressed media storage and the number of model
+    fields referencing it. Unreferenced blobs are removed by ``gc_media``.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(null=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["updated_at"],
+                name="mediablob_unreferenced_idx",
+                condition=models.Q(refcount=0),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount})"
+
+
+HASHTAG_RE = re.compile(r"#?(\w+)")
+HASHTAG_MAX_LENGTH = 100
+
+
+def parse_hashtags(value) -> list:
+    """Split a hashtags string into unique, normalized (lowercase) tags"""
+    tags = []
+    for tag in HASHTAG_RE.findall(value or ""):
+        tag = tag.lower()
+        if len(tag) <= HASHTAG_MAX_LENGTH and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _follow_count(column):
+    """Correlated ``COUNT(*)`` of Follow edges whose ``column`` is the row"""
+    counts = (
+        Follow.objects.filter(**{column: models.OuterRef("pk")})
+        .order_by()
+        .values(column)
+        .annotate(total=models.Count("*"))
+        .values("total")
+    )
+    return Coalesce(models.Subquery(counts), 0)
+
+
+class UserProfileQuerySet(models.QuerySet):
+
+    def with_follow_counts(self):
+        """Annotate ``followers_count`` and ``following_count``"""
+        return self.annotate(
+            followers_count=_follow_count("followee"),
+            following_count=_follow_count("follower"),
+        )
+
+    def with_posts_count(self, viewer):
+        """Annotate ``posts_count`` of posts visible to ``viewer``"""
+        counts = (
+            Post.objects.filter(owner_id=models.OuterRef("owner_id"))
+            .filter(models.Q(published=True) | models.Q(owner_id=viewer.id))
+            .order_by()
+            .values("owner_id")
+            .annotate(total=models.Count("*"))
+            .values("total")
+        )
+        return self.annotate(posts_count=Coalesce(models.Subquery(counts), 0))
+
+
 class UserProfile(models.Model):
 
     owner = models.OneToOneField(
@@ -33,7 +115,11 @@ class UserProfile(models.Model):
     profile_picture = models.ImageField(
         null=True,
         blank=True,
-        upload_to=profile_image_path
+        upload_to=profile_image_path,
+        storage=media_storage,
+    )
+    profile_picture_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
     )
     bio = models.TextField(
         blank=True
@@ -41,6 +127,8 @@ class UserProfile(models.Model):
     birth_date = models.DateField(
         null=True, blank=True
     )
+    # UPPER(location) is trigram indexed on PostgreSQL only
+    # (migration 0030_trigram_indexes).
     location = models.CharField(
         max_length=255, null=True, blank=True
     )
@@ -56,17 +144,64 @@ class UserProfile(models.Model):
     updated_at = models.DateTimeField(
         auto_now=True,
     )
-    followers = models.ManyToManyField(
-        "self", blank=True, related_name="user_followers", symmetrical=False
-    )
     following = models.ManyToManyField(
-        "self", blank=True, related_name="user_following", symmetrical=False
+        "self",
+        blank=True,
+        related_name="followers",
+        symmetrical=False,
+        through="Follow",
+        through_fields=("follower", "followee"),
     )
+    fanout_on_read = models.BooleanField(
+        default=False,
+        help_text=(
+            "Posts of high-follower accounts are merged into timelines "
+            "on read instead of being fanned out on publish."
+        ),
+    )
+
+    objects = UserProfileQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.owner.username
 
 
+class Follow(models.Model):
+    """Follow edge: ``follower`` follows ``followee``."""
+
+    follower = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name="following_edges"
+    )
+    followee = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name="follower_edges"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("follower", "followee")
+        indexes = [
+            models.Index(
+                fields=["followee", "follower"],
+                name="follow_followee_follower_idx",
+            ),
+            models.Index(
+                fields=["followee", "created_at", "id"],
+                name="follow_followee_created_idx",
+            ),
+            models.Index(
+                fields=["follower", "created_at", "id"],
+                name="follow_follower_created_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.follower_id} -> {self.followee_id}"
+
+
 class SocialLink(models.Model):
     profile = models.ForeignKey(
         UserProfile,
@@ -80,6 +215,15 @@ class SocialLink(models.Model):
         return f"{self.platform}: {self.url}"
 
 
+class Hashtag(models.Model):
+
+    name = models.CharField(max_length=HASHTAG_MAX_LENGTH, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
 class Post(models.Model):
 
     owner = models.ForeignKey(
@@ -92,18 +236,82 @@ class Post(models.Model):
     image = models.ImageField(
         blank=True,
         null=True,
-        upload_to=post_image_path
+        upload_to=post_image_path,
+        storage=media_storage,
+    )
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
     )
     hashtags = models.CharField(max_length=255, blank=True)
-    publish_date = models.DateField()
+    tags = models.ManyToManyField(
+        Hashtag,
+        through="PostHashtag",
+        related_name="posts",
+        blank=True,
+    )
+    publish_at = models.DateTimeField()
     published = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    dislike_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set when fan-out skipped the post; such posts are merged into
+    # followers' feeds on read, whatever the author's current mode.
+    merge_on_read = models.BooleanField(default=False, editable=False)
+    # GIN indexed on PostgreSQL only (migration 0029_post_search_vector).
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="post_created_at_id_idx"
+            ),
+            models.Index(
+                fields=["owner", "created_at", "id"],
+                name="post_owner_created_at_idx",
+            ),
+            models.Index(
+                fields=["publish_at"],
+                name="post_pending_publish_at_idx",
+                condition=models.Q(published=False),
+            ),
+            models.Index(
+                fields=["owner", "created_at", "id"],
+                name="post_merge_on_read_idx",
+                condition=models.Q(merge_on_read=True),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.owner.username} - {self.title}"
 
 
+class PostHashtag(models.Model):
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="post_hashtags"
+    )
+    hashtag = models.ForeignKey(
+        Hashtag,
+        on_delete=models.CASCADE,
+        related_name="post_hashtags"
+    )
+
+    class Meta:
+        unique_together = ("post", "hashtag")
+        indexes = [
+            models.Index(
+                fields=["hashtag", "post"], name="posthashtag_hashtag_post_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} #{self.hashtag_id}"
+
+
 class Comment(models.Model):
 
     post = models.ForeignKey(
@@ -116,8 +324,22 @@ class Comment(models.Model):
         related_name="comments",
         on_delete=models.CASCADE
     )
+    # UPPER(text) is trigram indexed on PostgreSQL only
+    # (migration 0030_trigram_indexes).
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="comment_created_at_id_idx"
+            ),
+            models.Index(
+                fields=["post", "created_at", "id"],
+                name="comment_post_created_at_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.text[:50]}"
@@ -147,6 +369,68 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ("user", "post")
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="like_created_at_id_idx"
+            ),
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="like_user_created_at_idx",
+            ),
+            models.Index(
+                fields=["post", "created_at", "id"],
+                name="like_post_created_at_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} {self.action}ed {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline row: ``post`` is in ``user``'s feed."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "post")
+        verbose_name_plural = "timeline entries"
+
+    def __str__(self):
+        return f"{self.user} <- {self.post_id}"
+
+
+class UploadSession(models.Model):
+    """A resumable upload whose bytes are appended to a temporary file."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["updated_at"], name="uploadsession_updated_at_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
@@ -0,0 +1,209 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    LimitOffsetPagination,
+)
+from rest_framework.utils.urls import remove_query_param
+
+
+def _encode_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the full ``ordering`` tuple.
+
+    Unlike ``CursorPagination`` the cursor stores the values of every
+    ordering field of the boundary row, so pages are fetched with a
+    ``WHERE (created_at, id) < (...)`` style filter and never use OFFSET.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = settings.CURSOR_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.CURSOR_MAX_PAGE_SIZE
+
+    def page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated rows of the requested page plus one look-ahead row,
+        or ``None`` if pagination is disabled
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        self.cursor = self.decode_cursor(request)
+        queryset = queryset.order_by(*self._ordering(self._reverse))
+        if self._position is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(self._position, self._reverse)
+            )
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        reverse, position = self._reverse, self._position
+
+        results = list(queryset)
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = self._parse_position(position)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def _parse_position(self, position) -> list:
+        """Convert cursor values to the types of their ordering fields"""
+        values = []
+        for field, value in zip(self.ordering, position):
+            if value is None:
+                raise ValueError("Cursor values cannot be null.")
+            try:
+                to_python = self.model._meta.get_field(
+                    field.lstrip("-")
+                ).to_python
+            except FieldDoesNotExist:
+                # Annotations such as the search ``rank`` are floats.
+                to_python = float
+            values.append(to_python(value))
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Reversed past the newest row: the next page is the first one.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Paged past the oldest row: the previous page is the last one.
+            return self.encode_cursor(
+                Cursor(offset=0, reverse=True, position=None)
+            )
+        position = self._get_position_from_instance(
+            self.page[0], self.ordering
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            field_name = field.lstrip("-")
+            if isinstance(instance, dict):
+                value = instance[field_name]
+            else:
+                value = getattr(instance, field_name)
+            values.append(_encode_value(value))
+        return json.dumps(values, separators=(",", ":"))
+
+    @property
+    def _reverse(self):
+        return self.cursor is not None and self.cursor.reverse
+
+    @property
+    def _position(self):
+        return None if self.cursor is None else self.cursor.position
+
+    def _ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def _keyset_filter(self, position, reverse) -> Q:
+        """Rows strictly after ``position`` in the requested direction"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            field_name = field.lstrip("-")
+            descending = field.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal, **{f"{field_name}__{lookup}": value})
+            equal[field_name] = value
+        return condition
+
+
+class RankedCursorPagination(KeysetCursorPagination):
+    """Keyset pagination of search results ordered by relevance"""
+
+    ordering = ("-rank", "-created_at", "-id")
+
+
+class KeysetPaginationMixin:
+    """
+    Paginate viewsets with ``KeysetCursorPagination``, falling back to
+    offset pagination for clients sending ``?limit=`` or ``?offset=``
+    """
+
+    pagination_class = KeysetCursorPagination
+    offset_pagination_class = LimitOffsetPagination
+
+    def get_pagination_class(self):
+        query_params = self.request.query_params if self.request else {}
+        if "limit" in query_params or "offset" in query_params:
+            return self.offset_pagination_class
+        return self.pagination_class
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            pagination_class = self.get_pagination_class()
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
@@ -0,0 +1,124 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from social.models import Like, Post
+from social.signals import post_reacted
+
+LIKE = Like.ActionChoices.LIKE
+DISLIKE = Like.ActionChoices.DISLIKE
+CLEAR = "clear"
+
+COUNTERS = {
+    LIKE: "like_count",
+    DISLIKE: "dislike_count",
+}
+
+
+def _opposite(action):
+    return DISLIKE if action == LIKE else LIKE
+
+
+def _upsert_postgres(user_id, post_id, action):
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        # The WHERE makes repeating the same reaction a no-op returning no
+        # row; xmax = 0 tells a fresh insert from a switched reaction.
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, post_id, action, created_at) "
+            "VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (user_id, post_id) DO UPDATE "
+            "SET action = EXCLUDED.action "
+            f"WHERE {table}.action IS DISTINCT FROM EXCLUDED.action "
+            "RETURNING (xmax = 0)",
+            [user_id, post_id, action, timezone.now()],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return action
+    inserted = row[0]
+    return None if inserted else _opposite(action)
+
+
+def _clear_postgres(user_id, post_id):
+    table = connection.ops.quote_name(Like._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE user_id = %s AND post_id = %s "
+            "RETURNING action",
+            [user_id, post_id],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _upsert_orm(user_id, post_id, action):
+    like, created = Like.objects.select_for_update().get_or_create(
+        user_id=user_id, post_id=post_id, defaults={"action": action}
+    )
+    if created:
+        return None
+    previous = like.action
+    if previous != action:
+        Like.objects.filter(pk=like.pk).update(action=action)
+    return previous
+
+
+def _clear_orm(user_id, post_id):
+    like = Like.objects.select_for_update().filter(
+        user_id=user_id, post_id=post_id
+    ).first()
+    if like is None:
+        return None
+    like.delete()
+    return like.action
+
+
+def _update_counters(post_id, previous, current) -> None:
+    if previous == current:
+        return
+    updates = {}
+    if previous:
+        field = COUNTERS[previous]
+        updates[field] = Greatest(F(field) - 1, 0)
+    if current:
+        field = COUNTERS[current]
+        updates[field] = F(field) + 1
+    Post.objects.filter(pk=post_id).update(**updates)
+
+
+@transaction.atomic()
+def react(user_id, post_id, action) -> dict:
+    """
+    Set ``user_id``'s reaction to ``post_id`` to ``like``, ``dislike`` or
+    ``clear`` and return the resulting reaction and post counters
+    """
+    # On PostgreSQL one statement writes the reaction and reports the
+    # previous one, so concurrent requests never hit the unique constraint.
+    postgres = connection.vendor == "postgresql"
+    if action == CLEAR:
+        current = None
+        clear = _clear_postgres if postgres else _clear_orm
+        previous = clear(user_id, post_id)
+    else:
+        current = action
+        upsert = _upsert_postgres if postgres else _upsert_orm
+        previous = upsert(user_id, post_id, action)
+
+    _update_counters(post_id, previous, current)
+    if previous != current:
+        transaction.on_commit(
+            lambda: post_reacted.send(
+                sender=Like, post_id=post_id, user_id=user_id, action=current
+            )
+        )
+    counters = Post.objects.filter(pk=post_id).values(
+        "like_count", "dislike_count"
+    ).get()
+    return {
+        "post": post_id,
+        "action": current,
+        "previous_action": previous,
+        **counters,
+    }
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Upper
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from social.models import Hashtag, Post, parse_hashtags
+
+SEARCH_FIELDS = ("title", "text")
+
+
+def post_search_vector():
+    return (
+        SearchVector("title", weight="A", config=settings.SEARCH_CONFIG)
+        + SearchVector("text", weight="B", config=settings.SEARCH_CONFIG)
+    )
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def update_search_vector(post_ids) -> None:
+    """Refresh the stored search vector of the given posts"""
+    if _is_postgres():
+        Post.objects.filter(pk__in=post_ids).update(
+            search_vector=post_search_vector()
+        )
+
+
+def set_post_hashtags(post) -> None:
+    """Sync the tags of ``post`` with its ``hashtags`` string"""
+    names = parse_hashtags(post.hashtags)
+    Hashtag.objects.bulk_create(
+        [Hashtag(name=name) for name in names], ignore_conflicts=True
+    )
+    post.tags.set(Hashtag.objects.filter(name__in=names))
+
+
+def _indexed_values(post):
+    # Deferred columns are unknown, so such instances always resync.
+    deferred = post.get_deferred_fields()
+    if deferred & {"hashtags", *SEARCH_FIELDS}:
+        return None
+    return {name: getattr(post, name) for name in ("hashtags", *SEARCH_FIELDS)}
+
+
+@receiver(post_init, sender=Post)
+def _remember_indexed_values(sender, instance, **kwargs) -> None:
+    instance._indexed_values = _indexed_values(instance)
+
+
+@receiver(post_save, sender=Post)
+def _sync_indexes(
+    sender, instance, created, update_fields=None, **kwargs
+) -> None:
+    previous = None if created else instance._indexed_values
+    current = _indexed_values(instance)
+
+    def changed(*names):
+        if update_fields is not None and not update_fields & set(names):
+            return False
+        return previous is None or any(
+            previous[name] != getattr(instance, name) for name in names
+        )
+
+    if changed("hashtags"):
+        set_post_hashtags(instance)
+    if changed(*SEARCH_FIELDS):
+        update_search_vector([instance.pk])
+    instance._indexed_values = current
+
+
+def search_posts(queryset, text):
+    """Filter ``queryset`` by ``text`` and annotate a ``rank`` to order by"""
+    if not _is_postgres():
+        return queryset.filter(
+            Q(title__icontains=text) | Q(text__icontains=text)
+        ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    query = SearchQuery(
+        text, config=settings.SEARCH_CONFIG, search_type="websearch"
+    )
+    # ts_rank returns a float4; cast it so cursor values round-trip exactly.
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+    )
+
+
+def substring_search(queryset, field_name, text, fuzzy=False):
+    """
+    Filter ``queryset`` by ``text`` occurring in ``field_name``. With
+    ``fuzzy`` typo-tolerant trigram matching is used instead and a
+    similarity ``rank`` is annotated to order by.
+    """
+    if not fuzzy:
+        return queryset.filter(**{f"{field_name}__icontains": text})
+    if not _is_postgres():
+        return queryset.filter(
+            **{f"{field_name}__icontains": text}
+        ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    # Match on UPPER(column) so the same trigram index serves both modes.
+    column = Upper(field_name)
+    alias = f"{field_name}_upper"
+    return queryset.alias(**{alias: column}).filter(
+        **{f"{alias}__trigram_similar": text}
+    ).annotate(
+        rank=Cast(TrigramSimilarity(column, text), FloatField())
+    )
@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from itertools import accumulate
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+
+from social.models import Hashtag
+
+
+def next_id(model) -> int:
+    """First primary key above the current rows of ``model``"""
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def reset_sequences(models) -> None:
+    """Move primary key sequences past explicitly inserted ids"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def power_law_weights(count, exponent, rng) -> list:
+    """
+    Cumulative sampling weights of ``count`` items whose chance of being
+    picked follows a power law with ``exponent`` (the exponent of the
+    resulting degree distribution); ranks are shuffled with ``rng``
+    """
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    skew = 1 / max(exponent - 1, 0.01)
+    return list(accumulate(rank ** -skew for rank in ranks))
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class BulkWriter:
+    """
+    Buffer rows of ``model`` and write them in batches, with COPY when
+    ``use_copy``; rows bypass ``save()`` and signals
+    """
+
+    def __init__(self, model, batch_size, now, use_copy, depends=()):
+        self.model = model
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.depends = depends
+        self.fields = model._meta.concrete_fields
+        self.defaults = {}
+        for field in self.fields:
+            if getattr(field, "auto_now", False) or getattr(
+                field, "auto_now_add", False
+            ):
+                self.defaults[field.attname] = now
+            elif not field.primary_key:
+                self.defaults[field.attname] = field.get_default()
+        self.rows = []
+        self.written = 0
+
+    def add(self, **values) -> None:
+        self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        # Rows referenced by this model's rows are written first.
+        for writer in self.depends:
+            writer.flush()
+        if not self.rows:
+            return
+        rows = [{**self.defaults, **row} for row in self.rows]
+        if self.use_copy:
+            self._copy(rows)
+        else:
+            self.model.objects.bulk_create(
+                [self.model(**row) for row in rows],
+                batch_size=self.batch_size,
+            )
+        self.written += len(rows)
+        self.rows = []
+
+    def _copy(self, rows) -> None:
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(
+                "\t".join(
+                    _copy_value(row[field.attname]) for field in self.fields
+                )
+            )
+            buffer.write("\n")
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(self.model._meta.db_table)} ({columns}) "
+                "FROM STDIN",
+                buffer,
+            )
+
+
+class HashtagIds:
+    """Ids of hashtags by name, created on first use"""
+
+    def __init__(self):
+        self.ids = {}
+
+    def __call__(self, names) -> list:
+        missing = [name for name in names if name not in self.ids]
+        if missing:
+            Hashtag.objects.bulk_create(
+                [Hashtag(name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            self.ids.update(
+                Hashtag.objects.filter(name__in=missing).values_list(
+                    "name", "id"
+                )
+            )
+        return [self.ids[name] for name in names]
+
+
+def read_records(path):
+    """Yield the records of an NDJSON (one object per line) or CSV file"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as source:
+        if extension == ".csv":
+            for record in csv.DictReader(source):
+                yield {
+                    key: value for key, value in record.items() if value != ""
+                }
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
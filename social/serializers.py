@@ -1,14 +1,53 @@
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.reverse import reverse
 
+from social.follow_graph import invalidate as invalidate_follow_graph
 from social.models import (
     Comment,
+    Follow,
     Like,
     Post,
     SocialLink,
-    UserProfile
+    UploadSession,
+    UserProfile,
 )
+from social.reactions import CLEAR, react
+from social.storage import media_storage
+from social.tasks import schedule_publication, schedule_renditions
+from social.timeline import add_followees, remove_followees
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Image rendition metadata with the stored paths turned into URLs"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get("request")
+
+        def url(name):
+            url = media_storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            **value,
+            "sizes": {
+                size: {
+                    key: url(item) if key in settings.IMAGE_RENDITION_FORMATS
+                    else item
+                    for key, item in rendition.items()
+                }
+                for size, rendition in value["sizes"].items()
+            },
+        }
 
 
 class SocialLinkSerializer(serializers.ModelSerializer):
@@ -36,7 +75,33 @@ class CommentListSerializer(serializers.ModelSerializer):
         fields = ("post", "text", "created_at")
 
 
+class CommentPreviewSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ("id", "user", "text", "created_at")
+
+
+class PublishDateField(serializers.DateField):
+    """Day-precision alias of ``publish_at`` kept for older clients"""
+
+    def to_internal_value(self, value):
+        day = super().to_internal_value(value)
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def to_representation(self, value):
+        if value is None:
+            return None
+        return super().to_representation(timezone.localdate(value))
+
+
 class PostSerializer(serializers.ModelSerializer):
+    # Both write publish_at; fields are validated in order, so an explicit
+    # publish_at wins over the deprecated publish_date.
+    publish_date = PublishDateField(source="publish_at", required=False)
+    publish_at = serializers.DateTimeField(required=False)
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Post
@@ -46,9 +111,11 @@ class PostSerializer(serializers.ModelSerializer):
             "title",
             "text",
             "image",
+            "image_renditions",
             "hashtags",
             "published",
             "publish_date",
+            "publish_at",
             "created_at",
             "updated_at",
         )
@@ -59,15 +126,58 @@ class PostSerializer(serializers.ModelSerializer):
             "updated_at"
         )
 
+    def validate(self, attrs):
+        data = super(PostSerializer, self).validate(attrs)
+        if self.instance is None and "publish_at" not in data:
+            raise serializers.ValidationError(
+                {"publish_at": "This field is required."}
+            )
+        return data
+
+    @transaction.atomic()
+    def create(self, validated_data) -> Post:
+        post = super().create(validated_data)
+        schedule_publication(post)
+        if post.image:
+            schedule_renditions(post, "image")
+        return post
+
+    @transaction.atomic()
+    def update(self, instance, validated_data) -> Post:
+        publish_at = instance.publish_at
+        if "image" in validated_data:
+            validated_data["image_renditions"] = {}
+        post = super().update(instance, validated_data)
+        if post.publish_at != publish_at:
+            schedule_publication(post)
+        if "image" in validated_data:
+            schedule_renditions(post, "image")
+        return post
+
 
 class PostListSerializer(serializers.ModelSerializer):
     owner = serializers.CharField(
         source="owner.username",
         read_only=True
     )
-    likes = serializers.CharField(read_only=True, source="likes.count")
+    likes = serializers.CharField(read_only=True, source="like_count")
+    image_renditions = RenditionsField()
 
-    comments = CommentListSerializer(many=True, read_only=True)
+    comments = CommentPreviewSerializer(
+        many=True,
+        read_only=True,
+        source="latest_comments"
+    )
+    comments_next = serializers.SerializerMethodField()
+
+    def get_comments_next(self, obj):
+        if obj.comment_count <= len(obj.latest_comments):
+            return None
+        return reverse(
+            "social:post-comments",
+            args=[obj.id],
+            request=self.context.get("request"),
+        )
 
     class Meta:
         model = Post
@@ -75,6 +185,7 @@ class PostListSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "image",
+            "image_renditions",
             "text",
             "hashtags",
             "owner",
@@ -82,7 +193,11 @@ class PostListSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "comments",
+            "comments_next",
             "likes",
+            "like_count",
+            "dislike_count",
+            "comment_count",
         )
         read_only_fields = (
             "owner",
@@ -98,12 +213,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only=False,
         required=False
     )
+    profile_picture_renditions = RenditionsField()
 
     class Meta:
         model = UserProfile
         fields = (
             "id",
             "profile_picture",
+            "profile_picture_renditions",
             "bio",
             "birth_date",
             "location",
@@ -120,18 +237,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
         profile = UserProfile.objects.create(**validated_data)
         self._create_or_update_social_links(profile, social_links_data)
+        if profile.profile_picture:
+            schedule_renditions(profile, "profile_picture")
 
         return profile
 
     def update(self, instance, validated_data) -> UserProfile:
         social_links_data = validated_data.pop("social_links", None)
+        if "profile_picture" in validated_data:
+            validated_data["profile_picture_renditions"] = {}
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
-        instance.social_links.all().delete()
-        self._create_or_update_social_links(instance, social_links_data)
+        if social_links_data is not None:
+            instance.social_links.all().delete()
+            self._create_or_update_social_links(instance, social_links_data)
+        if "profile_picture" in validated_data:
+            schedule_renditions(instance, "profile_picture")
 
         return instance
 
@@ -146,22 +270,65 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class UserProfileDetailSerializer(serializers.ModelSerializer):
 
     owner = serializers.SlugRelatedField(read_only=True, slug_field="username")
+    profile_picture_renditions = RenditionsField()
     social_links = SocialLinkSerializer(many=True, read_only=True)
 
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+    posts_count = serializers.IntegerField(read_only=True)
+
     posts = serializers.SerializerMethodField()
+    posts_next = serializers.SerializerMethodField()
 
     user_followers = serializers.SerializerMethodField()
+    user_followers_next = serializers.SerializerMethodField()
     user_following = serializers.SerializerMethodField()
+    user_following_next = serializers.SerializerMethodField()
+
+    def get_posts(self, obj) -> list:
+        posts = Post.objects.filter(owner_id=obj.owner_id)
+        if self.context["request"].user.id != obj.owner_id:
+            posts = posts.filter(published=True)
+        return list(
+            posts.order_by("-created_at", "-id").values_list(
+                "title", flat=True
+            )[:settings.PROFILE_PREVIEW_SIZE]
+        )
 
-    def get_posts(self, obj):
-        posts = Post.objects.filter(owner=obj.owner)
-        return [post.title for post in posts]
+    def get_posts_next(self, obj):
+        return self._next_link(obj, obj.posts_count, "profile-posts")
 
     def get_user_followers(self, obj) -> list:
-        return [follower.owner.username for follower in obj.followers.all()]
+        return self._preview_usernames(
+            Follow.objects.filter(followee=obj), "follower__owner__username"
+        )
+
+    def get_user_followers_next(self, obj):
+        return self._next_link(obj, obj.followers_count, "profile-followers")
 
     def get_user_following(self, obj) -> list:
-        return [following.owner.username for following in obj.following.all()]
+        return self._preview_usernames(
+            Follow.objects.filter(follower=obj), "followee__owner__username"
+        )
+
+    def get_user_following_next(self, obj):
+        return self._next_link(obj, obj.following_count, "profile-following")
+
+    def _preview_usernames(self, edges, username_field) -> list:
+        return list(
+            edges.order_by("-created_at", "-id").values_list(
+                username_field, flat=True
+            )[:settings.PROFILE_PREVIEW_SIZE]
+        )
+
+    def _next_link(self, obj, count, url_name):
+        if count <= settings.PROFILE_PREVIEW_SIZE:
+            return None
+        return reverse(
+            f"social:{url_name}",
+            args=[obj.id],
+            request=self.context.get("request"),
+        )
 
     class Meta:
         model = UserProfile
@@ -169,6 +336,7 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
             "id",
             "owner",
             "profile_picture",
+            "profile_picture_renditions",
             "bio",
             "birth_date",
             "location",
@@ -177,26 +345,51 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
             "social_links",
             "created_at",
             "updated_at",
+            "followers_count",
+            "following_count",
+            "posts_count",
             "user_followers",
+            "user_followers_next",
             "user_following",
+            "user_following_next",
             "posts",
+            "posts_next",
         )
         read_only_fields = ("owner", "creared_at", "updated_at")
 
 
+class FollowerSerializer(serializers.ModelSerializer):
+    profile = serializers.IntegerField(source="follower_id", read_only=True)
+    username = serializers.CharField(
+        source="follower.owner.username",
+        read_only=True
+    )
+
+    class Meta:
+        model = Follow
+        fields = ("profile", "username", "created_at")
+
+
+class FollowingSerializer(serializers.ModelSerializer):
+    profile = serializers.IntegerField(source="followee_id", read_only=True)
+    username = serializers.CharField(
+        source="followee.owner.username",
+        read_only=True
+    )
+
+    class Meta:
+        model = Follow
+        fields = ("profile", "username", "created_at")
+
+
 class UserProfileListSerializer(serializers.ModelSerializer):
     owner = serializers.SlugRelatedField(
         read_only=True,
         slug_field="username"
     )
-    followers_count = serializers.IntegerField(
-        read_only=True,
-        source="followers.count"
-    )
-    following_count = serializers.IntegerField(
-        read_only=True,
-        source="following.count"
-    )
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+    profile_picture_renditions = RenditionsField()
 
     class Meta:
         model = UserProfile
@@ -204,6 +397,7 @@ class UserProfileListSerializer(serializers.ModelSerializer):
             "id",
             "owner",
             "profile_picture",
+            "profile_picture_renditions",
             "location",
             "created_at",
             "updated_at",
@@ -213,65 +407,163 @@ class UserProfileListSerializer(serializers.ModelSerializer):
         read_only_fields = ("owner", "creared_at", "updated_at")
 
 
-class FollowUnfollowSerializer(serializers.ModelSerializer):
+class FollowUnfollowSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
     action = serializers.ChoiceField(choices=["follow", "unfollow"])
 
-    class Meta:
-        model = get_user_model()
-        fields = (
-            "user_id",
-            "action",
-        )
-
     def validate(self, attrs):
         data = super(FollowUnfollowSerializer, self).validate(attrs)
-        user_to_follow_unfollow = get_object_or_404(
-            get_user_model(),
-            pk=attrs["user_id"]
-        )
-
-        if user_to_follow_unfollow == self.context["request"].user:
+        if attrs["user_id"] == self.context["request"].user.id:
             raise serializers.ValidationError(
                 "You cannot follow/unfollow yourself."
             )
-        data["user_to_follow_unfollow"] = user_to_follow_unfollow
         return data
 
-    def save(self, *args, **kwargs) -> None:
+    @transaction.atomic()
+    def save(self, *args, **kwargs) -> dict:
+        """
+        Idempotently follow or unfollow ``user_id`` and return whether the
+        edge changed together with the updated follower/following counts
+        """
+        user = self.context["request"].user
+        action = self.validated_data["action"]
+        user_id = self.validated_data["user_id"]
+        profiles = {
+            owner_id: (profile_id, username)
+            for owner_id, profile_id, username in UserProfile.objects.filter(
+                owner_id__in=(user.id, user_id)
+            ).values_list("owner_id", "id", "owner__username")
+        }
+        if user_id not in profiles or user.id not in profiles:
+            raise NotFound("No UserProfile matches the given query.")
+        follower_id = profiles[user.id][0]
+        followee_id, username = profiles[user_id]
+
+        if action == "follow":
+            # get_or_create retries the lookup if a concurrent request
+            # inserted the same edge first, so double-taps are harmless.
+            _, changed = Follow.objects.get_or_create(
+                follower_id=follower_id, followee_id=followee_id
+            )
+            if changed:
+                add_followees(user.id, [user_id])
+        else:
+            deleted, _ = Follow.objects.filter(
+                follower_id=follower_id, followee_id=followee_id
+            ).delete()
+            changed = bool(deleted)
+            if changed:
+                remove_followees(user.id, [user_id])
+
+        counts = Follow.objects.filter(
+            Q(followee_id=followee_id) | Q(follower_id=follower_id)
+        ).aggregate(
+            followers_count=Count("id", filter=Q(followee_id=followee_id)),
+            following_count=Count("id", filter=Q(follower_id=follower_id)),
+        )
+        return {
+            "user_id": user_id,
+            "username": username,
+            "action": action,
+            "changed": changed,
+            **counts,
+        }
+
+
+class ReactorSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = Like
+        fields = ("user", "action", "created_at")
+
+
+class BulkFollowUnfollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.BULK_FOLLOW_MAX_SIZE,
+    )
+    action = serializers.ChoiceField(choices=["follow", "unfollow"])
+
+    @transaction.atomic()
+    def save(self, *args, **kwargs) -> list:
+        """
+        Follow or unfollow every target at once and return a
+        ``{"user_id", "status"}`` result per distinct requested id
+        """
+        user = self.context["request"].user
         action = self.validated_data["action"]
-        user_to_follow_unfollow = self.validated_data[
-            "user_to_follow_unfollow"
-        ]
+        user_ids = list(dict.fromkeys(self.validated_data["user_ids"]))
+        # Lock the follower row so concurrent bulk requests serialize.
         user_profile = get_object_or_404(
-            UserProfile,
-            owner=self.context["request"].user
+            UserProfile.objects.select_for_update(), owner=user
         )
-        follow_profile = get_object_or_404(
-            UserProfile,
-            owner=user_to_follow_unfollow
+        profile_ids = dict(
+            UserProfile.objects.filter(owner_id__in=user_ids).values_list(
+                "owner_id", "id"
+            )
+        )
+        existing = set(
+            Follow.objects.filter(
+                follower=user_profile,
+                followee_id__in=profile_ids.values(),
+            ).values_list("followee_id", flat=True)
         )
 
-        if action == "follow":
-            if user_profile.following.filter(id=follow_profile.id).exists():
-                raise serializers.ValidationError(
-                    "Already following this user."
+        results = []
+        changed = []
+        for user_id in user_ids:
+            profile_id = profile_ids.get(user_id)
+            if user_id == user.id:
+                result = "self"
+            elif profile_id is None:
+                result = "not_found"
+            elif action == "follow":
+                result = (
+                    "already_following" if profile_id in existing
+                    else "followed"
                 )
-            user_profile.following.add(follow_profile)
-            user_to_follow_unfollow.profile.followers.add(user_profile)
-
-        elif action == "unfollow":
-            if not user_profile.following.filter(
-                id=follow_profile.id
-            ).exists():
-                raise serializers.ValidationError(
-                    "You are not following this user."
+            else:
+                result = (
+                    "unfollowed" if profile_id in existing
+                    else "not_following"
                 )
-            user_profile.following.remove(follow_profile)
-            user_to_follow_unfollow.profile.followers.remove(user_profile)
+            if result in ("followed", "unfollowed"):
+                changed.append(user_id)
+            results.append({"user_id": user_id, "status": result})
+
+        if not changed:
+            return results
+        if action == "follow":
+            Follow.objects.bulk_create(
+                [
+                    Follow(
+                        follower=user_profile,
+                        followee_id=profile_ids[user_id],
+                    )
+                    for user_id in changed
+                ],
+                ignore_conflicts=True,
+            )
+            # bulk_create sends no post_save to invalidate the graph.
+            transaction.on_commit(
+                lambda: invalidate_follow_graph(user.id, *changed)
+            )
+            add_followees(user.id, changed)
+        else:
+            Follow.objects.filter(
+                follower=user_profile,
+                followee_id__in=[profile_ids[user_id] for user_id in changed],
+            ).delete()
+            remove_followees(user.id, changed)
+        return results
 
 
 class LikeSerializer(serializers.ModelSerializer):
+    action = serializers.ChoiceField(
+        choices=[*Like.ActionChoices.values, CLEAR]
+    )
 
     class Meta:
         model = Like
@@ -280,37 +572,54 @@ class LikeSerializer(serializers.ModelSerializer):
             "action",
         )
 
-    def validate(self, attrs):
-        data = super(LikeSerializer, self).validate(attrs)
-        post = attrs["post"]
-        action = attrs["action"]
-        user = self.context["request"].user
+    def save(self, **kwargs) -> dict:
+        """Upsert or clear the reaction and return its resulting state"""
+        return react(
+            self.context["request"].user.id,
+            self.validated_data["post"].pk,
+            self.validated_data["action"],
+        )
 
-        if action == "like" and Like.objects.filter(
-            user=user,
-            post=post
-        ).exists():
-            raise serializers.ValidationError(
-                "You have already liked this post."
-            )
-        if action == "dislike" and not Like.objects.filter(
-            user=user,
-            post=post
-        ).exists():
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            "id",
+            "filename",
+            "size",
+            "received",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = ("received", "created_at", "updated_at")
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
             raise serializers.ValidationError(
-                "You have not liked this post."
+                f"Size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes."
             )
+        return value
 
-        return data
-
-    def save(self, **kwargs):
-        action = self.validated_data["action"]
-        post = self.validated_data["post"]
-        user = self.context["request"].user
 
-        if action == "like":
-            Like.objects.create(user=user, post=post, action=action)
-        else:
-            Like.objects.filter(user=user, post=post).delete()
+class UploadFinalizeSerializer(serializers.Serializer):
+    post = serializers.PrimaryKeyRelatedField(
+        queryset=Post.objects.all(), required=False
+    )
+    profile = serializers.PrimaryKeyRelatedField(
+        queryset=UserProfile.objects.all(), required=False
+    )
 
-        return post
+    def validate(self, attrs):
+        data = super(UploadFinalizeSerializer, self).validate(attrs)
+        targets = [data[key] for key in ("post", "profile") if key in data]
+        if len(targets) != 1:
+            raise serializers.ValidationError(
+                "Provide exactly one of post or profile."
+            )
+        if targets[0].owner_id != self.context["request"].user.id:
+            raise serializers.ValidationError(
+                "You can only attach uploads to your own post or profile."
+            )
+        return data
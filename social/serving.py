@@ -0,0 +1,162 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from social.models import POST_IMAGE_DIRECTORY, PROFILE_IMAGE_DIRECTORY
+from social.storage import CAS_DIRECTORY, media_storage
+
+CAS_NAME_RE = re.compile(
+    rf"^{CAS_DIRECTORY}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})"
+    r"\.\w+$"
+)
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Images stored before content addressing, still linked by older rows.
+LEGACY_DIRECTORIES = (
+    f"{POST_IMAGE_DIRECTORY}/",
+    f"{PROFILE_IMAGE_DIRECTORY}/",
+)
+
+
+class _FileRange:
+    """Read at most ``length`` bytes of ``file`` from ``start`` on"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _resolve(path) -> str:
+    """Absolute path of a servable media file, or ``Http404``"""
+    # Only files the API links to: content-addressed names and legacy
+    # images, never temporary files or anything else under MEDIA_ROOT.
+    servable = CAS_NAME_RE.match(path) or (
+        path.startswith(LEGACY_DIRECTORIES)
+        and os.path.normpath(path) == path
+    )
+    if not servable:
+        raise Http404("Not found.")
+    try:
+        full_path = safe_join(media_storage.location, path)
+    except ValueError:
+        raise Http404("Not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found.")
+    return full_path
+
+
+def _parse_range(header, size):
+    """
+    Return ``(start, end)`` of a single satisfiable byte range, ``None``
+    to serve the whole file or ``False`` if the range is unsatisfiable
+    """
+    match = RANGE_RE.match(header or "")
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _offload(full_path, path):
+    response = HttpResponse()
+    # Let the web server pick the type of the file it sends.
+    del response["Content-Type"]
+    if settings.MEDIA_SENDFILE_BACKEND == "nginx":
+        response["X-Accel-Redirect"] = settings.MEDIA_SENDFILE_PREFIX + path
+    else:
+        response["X-Sendfile"] = full_path
+    return response
+
+
+def _stream(request, full_path, size, etag, last_modified):
+    # If-Range needs a strong validator to match.
+    if_range = request.headers.get("If-Range")
+    byte_range = None
+    if (
+        if_range is None
+        or if_range == http_date(last_modified)
+        or (if_range == etag and not etag.startswith("W/"))
+    ):
+        byte_range = _parse_range(request.headers.get("Range"), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"))
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            _FileRange(open(full_path, "rb"), start, length), status=206
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    content_type, _ = mimetypes.guess_type(full_path)
+    if content_type:
+        response["Content-Type"] = content_type
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded media file with validators and cache headers"""
+    full_path = _resolve(path)
+    stat = os.stat(full_path)
+    last_modified = int(stat.st_mtime)
+
+    cas_name = CAS_NAME_RE.match(path)
+    if cas_name:
+        etag = quote_etag(cas_name["digest"])
+        cache_control = {
+            "public": True,
+            "max-age": settings.MEDIA_CACHE_MAX_AGE,
+            "immutable": True,
+        }
+    else:
+        etag = f'W/"{last_modified:x}-{stat.st_size:x}"'
+        cache_control = {"public": True, "no-cache": True}
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_SENDFILE_BACKEND:
+            response = _offload(full_path, path)
+        else:
+            response = _stream(
+                request, full_path, stat.st_size, etag, last_modified
+            )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, **cache_control)
+    return response
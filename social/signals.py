@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent with sender=Post, post_id and owner_id once the transaction that
+# published the post has committed.
+post_published = Signal()
+# Sent with sender=Like, post_id, user_id and the new action (None once
+# cleared) after a committed change of a reaction.
+post_reacted = Signal()
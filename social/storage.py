@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models.functions import Now
+
+CAS_DIRECTORY = "cas"
+
+
+def content_name(digest, extension) -> str:
+    return os.path.join(
+        CAS_DIRECTORY, digest[:2], digest[2:4], f"{digest}{extension.lower()}"
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each file once, named by the SHA-256 of its content"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in ``_save``.
+        return name
+
+    def _save(self, name, content):
+        _, extension = os.path.splitext(name)
+        temp_directory = self.path(os.path.join(CAS_DIRECTORY, "tmp"))
+        os.makedirs(temp_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(
+            dir=temp_directory, delete=False
+        ) as temp_file:
+            try:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.unlink(temp_file.name)
+                raise
+
+        name = content_name(digest.hexdigest(), extension)
+        path = self.path(name)
+        MediaBlob = apps.get_model("social", "MediaBlob")
+        with transaction.atomic():
+            # Touching the blob locks its row and restarts its GC grace
+            # period. gc_media deletes the row and the file under the same
+            # lock, so a row it deleted meanwhile is re-created here and
+            # the file is checked only after gc_media removed it.
+            while not MediaBlob.objects.filter(name=name).update(
+                updated_at=Now()
+            ):
+                MediaBlob.objects.bulk_create(
+                    [MediaBlob(name=name, size=size)], ignore_conflicts=True
+                )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.unlink(temp_file.name)
+            else:
+                os.replace(temp_file.name, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        return name
+
+
+media_storage = ContentAddressedStorage()
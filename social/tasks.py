@@ -1,19 +1,137 @@
-from datetime import date
+from datetime import timedelta
+
 from celery import shared_task
-from django.db.models import Q
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from social.images import build_renditions, renditions_field
+from social.media import acquire, release, rendition_names
+from social.models import Post, UploadSession
+from social.signals import post_published
+from social.timeline import fan_out_posts, trim_timelines
+from social.uploads import discard
+
+
+def _publish_chunk(**filters) -> list:
+    """
+    Publish up to ``PUBLISH_BATCH_SIZE`` due posts matching ``filters``
+    with one UPDATE and return their ``(id, owner_id)`` pairs. Rows locked
+    by another worker are skipped, so concurrent runs never publish the
+    same post twice.
+    """
+    with transaction.atomic():
+        chunk = list(
+            Post.objects.select_for_update(skip_locked=True)
+            .filter(
+                published=False, publish_at__lte=timezone.now(), **filters
+            )
+            .order_by("id")
+            .values_list("id", "owner_id")[:settings.PUBLISH_BATCH_SIZE]
+        )
+        if chunk:
+            Post.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                published=True, updated_at=timezone.now()
+            )
+            fan_out_posts(chunk)
+    return chunk
 
-from social.models import Post
+
+def _announce(chunk) -> None:
+    for post_id, owner_id in chunk:
+        post_published.send(sender=Post, post_id=post_id, owner_id=owner_id)
+
+
+def schedule_publication(post) -> None:
+    """Enqueue ``publish_post`` for ``post``'s ``publish_at`` on commit"""
+    if post.published:
+        return
+    post_id, publish_at = post.pk, post.publish_at
+    # A broker outage must not fail the committed request; the sweeper
+    # publishes posts whose task was never enqueued.
+    transaction.on_commit(
+        lambda: publish_post.apply_async((post_id,), eta=publish_at),
+        robust=True,
+    )
+
+
+@shared_task
+def publish_post(post_id):
+    """
+    Publish a single post at its scheduled time. Runs that fire early
+    (the post was rescheduled) or late (already published) do nothing.
+    """
+    chunk = _publish_chunk(pk=post_id)
+    _announce(chunk)
+    return f"Successfully published {len(chunk)} posts."
 
 
 @shared_task
 def create_and_schedule_post():
-    unpublished_posts = Post.objects.filter(
-        published=False,
-        publish_date=date.today()
-    )
-    for post in unpublished_posts:
-        post.published = True
-        post.save()
+    """Publish all overdue posts, catching up on missed ETA tasks"""
+    published = 0
+    while chunk := _publish_chunk():
+        _announce(chunk)
+        published += len(chunk)
     return (
-        f"Successfully published {unpublished_posts.count()} posts."
+        f"Successfully published {published} posts."
     )
+
+
+def schedule_renditions(instance, field_name) -> None:
+    """Enqueue ``create_image_renditions`` for a saved image on commit"""
+    name = getattr(instance, field_name).name
+    if not name:
+        return
+    label, pk = instance._meta.label_lower, instance.pk
+    # Without renditions clients fall back to the original image.
+    transaction.on_commit(
+        lambda: create_image_renditions.delay(label, pk, field_name, name),
+        robust=True,
+    )
+
+
+@shared_task
+def create_image_renditions(model_label, pk, field_name, name):
+    """Resize an uploaded image into WebP and JPEG renditions"""
+    model = apps.get_model(model_label)
+    renditions = renditions_field(field_name)
+    current = {"pk": pk, field_name: name}
+    if not model.objects.filter(**current).exists():
+        return f"Skipped {name}: image was replaced or removed."
+
+    metadata = build_renditions(name)
+    with transaction.atomic():
+        # Only record the renditions if the image was not replaced meanwhile.
+        previous = model.objects.select_for_update().filter(
+            **current
+        ).values_list(renditions, flat=True).first()
+        if previous is None:
+            return f"Skipped {name}: image was replaced or removed."
+        # Bump updated_at so conditional GETs see the new renditions.
+        model.objects.filter(pk=pk).update(
+            **{renditions: metadata}, updated_at=timezone.now()
+        )
+        # Queryset updates bypass the reference-counting signals.
+        names, previous = rendition_names(metadata), rendition_names(previous)
+        acquire(names - previous)
+        release(previous - names)
+    return f"Created {len(metadata['sizes'])} renditions of {name}."
+
+
+@shared_task
+def reap_upload_sessions():
+    """Delete upload sessions idle for longer than ``UPLOAD_SESSION_TTL``"""
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    reaped = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff):
+        discard(session)
+        reaped += 1
+    return f"Reaped {reaped} upload sessions."
+
+
+@shared_task
+def trim_old_timeline_entries():
+    """Drop timeline entries beyond ``TIMELINE_RETENTION_SIZE`` per user"""
+    return f"Trimmed {trim_timelines()} timeline entries."
@@ -1,3 +1,992 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import time
+from base64 import b64encode
+from datetime import timedelta
+from io import StringIO
+from threading import Barrier, Event, Thread
+from unittest import skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from social import feed_cache
+from social.feed_cache import _page_keys, cached_feed
+from social.follow_graph import follower_ids, following_ids
+from social.models import (
+    Comment,
+    Follow,
+    Like,
+    MediaBlob,
+    Post,
+    TimelineEntry,
+    UserProfile,
+)
+from social.reactions import react
+from social.search import substring_search
+from social.signals import post_published, post_reacted
+from social.storage import media_storage
+from social.tasks import _publish_chunk, create_and_schedule_post, publish_post
+
+POSTGRES = connection.vendor == "postgresql"
+FOLLOW_URL = reverse("social:follow_user")
+POSTS_URL = reverse("social:post-list")
+SEARCH_URL = reverse("social:post-search")
+LIKES_URL = reverse("social:like-list")
+COMMENTS_URL = reverse("social:comment-list")
+
+
+def create_user(name):
+    user = get_user_model().objects.create_user(
+        email=f"{name}@example.com", password="password", username=name
+    )
+    UserProfile.objects.create(owner=user)
+    return user
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def create_posts(owner, count, publish_at) -> list:
+    """Unpublished posts created without signals or scheduled tasks"""
+    return Post.objects.bulk_create(
+        Post(owner=owner, title=f"Post {index}", publish_at=publish_at)
+        for index in range(count)
+    )
+
+
+def collect_published(test) -> list:
+    """Connect a receiver collecting the ids sent with ``post_published``"""
+    post_ids = []
+
+    def receiver(sender, post_id, **kwargs):
+        post_ids.append(post_id)
+
+    post_published.connect(receiver, sender=Post, weak=False)
+    test.addCleanup(post_published.disconnect, receiver, sender=Post)
+    return post_ids
+
+
+def local_memory_caches(location) -> dict:
+    """``CACHES`` with a private local-memory default cache"""
+    return {
+        **settings.CACHES,
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": location,
+        },
+    }
+
+
+@override_settings(CACHES=local_memory_caches("social-tests"))
+class CacheIsolatedTestCase(TestCase):
+    """
+    Run each test with an empty default cache: follow-graph invalidation
+    waits for commits that never happen inside a test
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+def use_temporary_media_root(test) -> None:
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    settings_override = override_settings(MEDIA_ROOT=media_root)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+def collect_media() -> None:
+    call_command("gc_media", grace_hours=0, stdout=StringIO())
+
+
+def run_in_thread(target):
+    """Start ``target`` in a thread; return a function joining its result"""
+    result = []
+
+    def run():
+        try:
+            result.append(target())
+        finally:
+            connection.close()
+
+    thread = Thread(target=run)
+    thread.start()
+
+    def join():
+        thread.join()
+        return result[0]
+
+    return join
+
+
+def run_concurrently(target, count) -> list:
+    """Call ``target`` from ``count`` threads at once and return results"""
+    barrier = Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = target()
+        finally:
+            connection.close()
+
+    threads = [Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class KeysetPaginationTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("reader")
+        author = create_user("author")
+        for index in range(3):
+            post = Post.objects.create(
+                owner=author,
+                title=f"Post {index}",
+                publish_at=timezone.now(),
+                published=True,
+            )
+            react(self.user.id, post.id, "like")
+        self.client = client_for(self.user)
+
+    def get_page(self, position):
+        cursor = b64encode(urlencode({"p": json.dumps(position)}).encode())
+        return self.client.get(
+            LIKES_URL, {"cursor": cursor.decode(), "page_size": 2}
+        )
+
+    def test_pages_follow_the_next_cursor(self):
+        first = self.client.get(LIKES_URL, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+    def test_tampered_cursor_is_not_found(self):
+        positions = (
+            ["x", "y"],
+            [timezone.now().isoformat(), "1.5"],
+            [timezone.now().isoformat(), None],
+            [{}, []],
+            ["x"],
+        )
+        for position in positions:
+            with self.subTest(position=position):
+                response = self.get_page(position)
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+
+class PostSearchTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user("reader")
+        self.author = create_user("author")
+        Follow.objects.create(
+            follower=self.reader.profile, followee=self.author.profile
+        )
+        self.client = client_for(self.reader)
+
+    def publish(self, owner, title, hashtags="", publish_at=None):
+        post = Post.objects.create(
+            owner=owner,
+            title=title,
+            hashtags=hashtags,
+            publish_at=publish_at or timezone.now(),
+        )
+        publish_post(post.id)
+        return post
+
+    def search(self, **params):
+        return self.client.get(SEARCH_URL, params)
+
+    def titles(self, response):
+        return {post["title"] for post in response.data["results"]}
+
+    def test_only_visible_published_posts_match(self):
+        self.publish(self.author, "Sunrise at the lake")
+        self.publish(self.reader, "My sunrise")
+        self.publish(self.author, "Sunset at the lake")
+        self.publish(create_user("stranger"), "Stranger sunrise")
+        self.publish(
+            self.author,
+            "Scheduled sunrise",
+            publish_at=timezone.now() + timedelta(hours=1),
+        )
+
+        response = self.search(q="sunrise")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.titles(response), {"Sunrise at the lake", "My sunrise"}
+        )
+
+    def test_hashtag_filter(self):
+        self.publish(self.author, "Sunrise at the beach", "#beach")
+        self.publish(self.author, "Sunrise in the city", "#city")
+
+        response = self.search(q="sunrise", hashtag="#beach")
+
+        self.assertEqual(self.titles(response), {"Sunrise at the beach"})
+
+    def test_results_are_paginated(self):
+        for index in range(3):
+            self.publish(self.author, f"Sunrise {index}")
+
+        first = self.search(q="sunrise", page_size=2)
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertIsNone(second.data["next"])
+        self.assertEqual(
+            self.titles(first) | self.titles(second),
+            {"Sunrise 0", "Sunrise 1", "Sunrise 2"},
+        )
+
+    def test_query_is_required(self):
+        response = self.search(q=" ")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(POSTGRES, "Trigram indexes are PostgreSQL-only")
+class TrigramIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            User(email=f"user{index}@example.com", username=f"user{index}")
+            for index in range(200)
+        )
+        UserProfile.objects.bulk_create(
+            UserProfile(owner=user, location=f"City {index}")
+            for index, user in enumerate(users)
+        )
+        UserProfile.objects.filter(owner=users[0]).update(location="Amsterdam")
+        post = Post.objects.create(
+            owner=users[0], title="Post", publish_at=timezone.now()
+        )
+        comments = Comment.objects.bulk_create(
+            Comment(post=post, user=user, text=f"Comment number {index}")
+            for index, user in enumerate(users)
+        )
+        comments[0].text = "Watching the sunrise"
+        comments[0].save()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE social_comment, social_userprofile")
+            # Small tables are cheaper to scan sequentially; disabling seq
+            # scans shows whether the planner can use the index at all.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_comment_icontains_uses_trigram_index(self):
+        queryset = Comment.objects.filter(text__icontains="SUNRISE")
+
+        self.assertIn("comment_text_trgm_idx", queryset.explain())
+        self.assertEqual(
+            list(queryset.values_list("text", flat=True)),
+            ["Watching the sunrise"],
+        )
+
+    def test_location_icontains_uses_trigram_index(self):
+        queryset = substring_search(
+            UserProfile.objects.all(), "location", "sterd"
+        )
+
+        self.assertIn("profile_location_trgm_idx", queryset.explain())
+        self.assertEqual(
+            list(queryset.values_list("location", flat=True)), ["Amsterdam"]
+        )
+
+    def test_fuzzy_location_uses_trigram_index(self):
+        queryset = substring_search(
+            UserProfile.objects.all(), "location", "Amsterdm", fuzzy=True
+        )
+
+        self.assertIn("profile_location_trgm_idx", queryset.explain())
+        self.assertEqual(
+            list(queryset.values_list("location", flat=True)), ["Amsterdam"]
+        )
+
+
+class FollowGraphTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("follower")
+        self.author = create_user("author")
+
+    def test_follow_writes_invalidate_the_cached_graph(self):
+        self.assertEqual(following_ids(self.user.id), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow = Follow.objects.create(
+                follower=self.user.profile, followee=self.author.profile
+            )
+        self.assertEqual(following_ids(self.user.id), {self.author.id})
+        self.assertEqual(follower_ids(self.author.id), {self.user.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+        self.assertEqual(following_ids(self.user.id), set())
+        self.assertEqual(follower_ids(self.author.id), set())
+
+
+class FollowUnfollowTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("follower")
+        self.author = create_user("author")
+        self.post = Post.objects.create(
+            owner=self.author,
+            title="Post",
+            publish_at=timezone.now(),
+            published=True,
+        )
+        self.client = client_for(self.user)
+
+    def follow(self, action="follow", user_id=None):
+        return self.client.post(
+            FOLLOW_URL,
+            {"user_id": user_id or self.author.id, "action": action},
+            format="json",
+        )
+
+    def test_follow_twice_is_idempotent(self):
+        first = self.follow()
+        second = self.follow()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertTrue(first.data["changed"])
+        self.assertFalse(second.data["changed"])
+        self.assertEqual(second.data["followers_count"], 1)
+        self.assertEqual(second.data["following_count"], 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_follow_adds_posts_to_timeline(self):
+        self.follow()
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.post
+            ).exists()
+        )
+
+    def test_unfollow_twice_is_idempotent(self):
+        self.follow()
+
+        first = self.follow("unfollow")
+        second = self.follow("unfollow")
+
+        self.assertTrue(first.data["changed"])
+        self.assertFalse(second.data["changed"])
+        self.assertEqual(second.data["followers_count"], 0)
+        self.assertEqual(second.data["following_count"], 0)
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.post
+            ).exists()
+        )
+
+    def test_follow_self_is_rejected(self):
+        response = self.follow(user_id=self.user.id)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follow_unknown_user_is_not_found(self):
+        response = self.follow(user_id=self.author.id + 100)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(POSTGRES, "Needs row-level locking")
+class ConcurrentFollowTests(TransactionTestCase):
+
+    def test_concurrent_follows_create_one_edge(self):
+        user = create_user("follower")
+        author = create_user("author")
+
+        def follow():
+            return client_for(user).post(
+                FOLLOW_URL,
+                {"user_id": author.id, "action": "follow"},
+                format="json",
+            )
+
+        responses = run_concurrently(follow, 4)
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_200_OK] * 4,
+        )
+        self.assertEqual(
+            sum(response.data["changed"] for response in responses), 1
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+
+
+class MediaGarbageCollectionTests(TestCase):
+
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def store(self, content=b"image"):
+        return media_storage.save("image.jpg", ContentFile(content))
+
+    def test_unreferenced_blobs_are_deleted(self):
+        name = self.store()
+
+        collect_media()
+
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(media_storage.exists(name))
+
+    def test_referenced_blobs_are_kept(self):
+        name = self.store()
+        MediaBlob.objects.filter(name=name).update(refcount=1)
+
+        collect_media()
+
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(media_storage.exists(name))
+
+    def test_blobs_within_the_grace_period_are_kept(self):
+        name = self.store()
+
+        call_command("gc_media", stdout=StringIO())
+
+        self.assertTrue(media_storage.exists(name))
+
+    def test_storing_collected_content_recreates_blob_and_file(self):
+        name = self.store()
+        collect_media()
+
+        self.assertEqual(self.store(), name)
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(media_storage.exists(name))
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def write(self, name):
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"image")
+
+    def get(self, name):
+        return self.client.get(reverse("media", args=[name]))
+
+    def test_content_addressed_files_are_served(self):
+        name = media_storage.save("image.jpg", ContentFile(b"image"))
+
+        response = self.get(name)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"image")
+
+    def test_legacy_images_are_served(self):
+        self.write("post/images/post-202401010000.jpg")
+
+        response = self.get("post/images/post-202401010000.jpg")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_files_are_not_served(self):
+        for name in ("secret.txt", "cas/tmp/upload.jpg"):
+            self.write(name)
+        names = (
+            "secret.txt",
+            "cas/tmp/upload.jpg",
+            "post/images/../../secret.txt",
+            "post/images/../../cas/tmp/upload.jpg",
+        )
+
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.get(name).status_code, status.HTTP_404_NOT_FOUND
+                )
+
+
+@skipUnless(POSTGRES, "Needs row-level locking")
+class ConcurrentMediaGarbageCollectionTests(TransactionTestCase):
+
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def test_upload_waits_for_collection_of_its_blob(self):
+        name = media_storage.save("image.jpg", ContentFile(b"image"))
+
+        with transaction.atomic():
+            # What gc_media does with an unreferenced blob.
+            MediaBlob.objects.select_for_update().get(name=name).delete()
+            media_storage.delete(name)
+            upload = run_in_thread(
+                lambda: media_storage.save(
+                    "image.jpg", ContentFile(b"image")
+                )
+            )
+            # Let the upload block on the row lock.
+            time.sleep(0.2)
+
+        self.assertEqual(upload(), name)
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(media_storage.exists(name))
+
+
+class ReactionTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("reader")
+        self.post = Post.objects.create(
+            owner=create_user("author"),
+            title="Post",
+            publish_at=timezone.now(),
+            published=True,
+        )
+        self.client = client_for(self.user)
+
+    def react(self, action):
+        return self.client.post(
+            LIKES_URL, {"post": self.post.id, "action": action}
+        )
+
+    def assert_counts(self, likes, dislikes):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, likes)
+        self.assertEqual(self.post.dislike_count, dislikes)
+
+    def test_like(self):
+        response = self.react("like")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["action"], "like")
+        self.assertIsNone(response.data["previous_action"])
+        self.assertEqual(response.data["like_count"], 1)
+        self.assert_counts(1, 0)
+
+    def test_repeated_like_is_a_no_op(self):
+        self.react("like")
+
+        response = self.react("like")
+
+        self.assertEqual(response.data["previous_action"], "like")
+        self.assert_counts(1, 0)
+        self.assertEqual(Like.objects.count(), 1)
+
+    def test_switch_to_dislike_moves_the_count(self):
+        self.react("like")
+
+        response = self.react("dislike")
+
+        self.assertEqual(response.data["previous_action"], "like")
+        self.assert_counts(0, 1)
+        self.assertEqual(Like.objects.get().action, "dislike")
+
+    def test_clear_removes_the_reaction(self):
+        self.react("dislike")
+
+        response = self.react("clear")
+
+        self.assertIsNone(response.data["action"])
+        self.assertEqual(response.data["previous_action"], "dislike")
+        self.assert_counts(0, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_destroy_clears_the_reaction(self):
+        self.react("like")
+        like = Like.objects.get()
+
+        response = self.client.delete(
+            reverse("social:like-detail", args=[like.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_counts(0, 0)
+
+    def test_update_is_not_allowed(self):
+        self.react("like")
+        url = reverse("social:like-detail", args=[Like.objects.get().id])
+        data = {"post": self.post.id, "action": "dislike"}
+
+        self.assertEqual(
+            self.client.put(url, data).status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+        self.assertEqual(
+            self.client.patch(url, data).status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+
+    def test_signal_is_sent_only_on_change(self):
+        actions = []
+
+        def receiver(sender, action, **kwargs):
+            actions.append(action)
+
+        post_reacted.connect(receiver, sender=Like)
+        self.addCleanup(post_reacted.disconnect, receiver, sender=Like)
+        for action in ("like", "like", "dislike", "clear", "clear"):
+            with self.captureOnCommitCallbacks(execute=True):
+                react(self.user.id, self.post.id, action)
+
+        self.assertEqual(actions, ["like", "dislike", None])
+
+
+@skipUnless(POSTGRES, "Needs INSERT ... ON CONFLICT")
+class ConcurrentReactionTests(TransactionTestCase):
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            owner=create_user("author"),
+            title="Post",
+            publish_at=timezone.now(),
+            published=True,
+        )
+
+    def test_concurrent_likes_are_counted_once(self):
+        user = create_user("reader")
+
+        results = run_concurrently(
+            lambda: react(user.id, self.post.id, "like"), 4
+        )
+
+        self.assertEqual(
+            [result["previous_action"] for result in results].count(None), 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(Like.objects.count(), 1)
+
+    def test_concurrent_switches_keep_counters_consistent(self):
+        users = [create_user(f"reader{index}") for index in range(4)]
+        for user in users:
+            react(user.id, self.post.id, "like")
+        pending = iter(users)
+
+        run_concurrently(
+            lambda: react(next(pending).id, self.post.id, "dislike"), 4
+        )
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertEqual(self.post.dislike_count, 4)
+
+
+class PublishScheduledPostsTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.reader = create_user("reader")
+        Follow.objects.create(
+            follower=self.reader.profile, followee=self.author.profile
+        )
+        self.published = collect_published(self)
+        self.past = timezone.now() - timedelta(hours=1)
+
+    def test_sweep_publishes_overdue_posts_in_chunks(self):
+        posts = create_posts(self.author, 5, self.past)
+        future = create_posts(
+            self.author, 1, timezone.now() + timedelta(hours=1)
+        )[0]
+
+        with override_settings(PUBLISH_BATCH_SIZE=2):
+            result = create_and_schedule_post()
+
+        self.assertEqual(result, "Successfully published 5 posts.")
+        self.assertEqual(
+            set(Post.objects.filter(published=True).values_list(
+                "id", flat=True
+            )),
+            {post.id for post in posts},
+        )
+        self.assertFalse(Post.objects.get(pk=future.pk).published)
+        self.assertEqual(
+            sorted(self.published), sorted(post.id for post in posts)
+        )
+
+    def test_publish_fans_out_to_followers(self):
+        post = create_posts(self.author, 1, self.past)[0]
+
+        publish_post(post.id)
+
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post).values_list(
+                "user_id", flat=True
+            )),
+            {self.author.id, self.reader.id},
+        )
+
+    def test_publish_is_skipped_when_early_or_done(self):
+        early = create_posts(
+            self.author, 1, timezone.now() + timedelta(hours=1)
+        )[0]
+        done = create_posts(self.author, 1, self.past)[0]
+        publish_post(done.id)
+        del self.published[:]
+
+        self.assertEqual(
+            publish_post(early.id), "Successfully published 0 posts."
+        )
+        self.assertEqual(
+            publish_post(done.id), "Successfully published 0 posts."
+        )
+        self.assertEqual(self.published, [])
+
+
+@skipUnless(POSTGRES, "Needs SELECT ... FOR UPDATE SKIP LOCKED")
+class ConcurrentPublishTests(TransactionTestCase):
+
+    def setUp(self):
+        self.author = create_user("author")
+        self.past = timezone.now() - timedelta(hours=1)
+
+    def test_locked_posts_are_skipped(self):
+        post = create_posts(self.author, 1, self.past)[0]
+
+        with transaction.atomic():
+            Post.objects.select_for_update().get(pk=post.pk)
+            chunks = run_concurrently(_publish_chunk, 1)
+
+        self.assertEqual(chunks, [[]])
+        self.assertEqual(_publish_chunk(), [(post.id, self.author.id)])
+
+    def test_concurrent_sweeps_publish_each_post_once(self):
+        posts = create_posts(self.author, 20, self.past)
+        published = collect_published(self)
+
+        with override_settings(PUBLISH_BATCH_SIZE=3):
+            run_concurrently(create_and_schedule_post, 4)
+
+        self.assertEqual(
+            sorted(published), sorted(post.id for post in posts)
+        )
+        self.assertFalse(Post.objects.filter(published=False).exists())
+
+
+@override_settings(FEED_CACHE_LOCK_WAIT=1, FEED_CACHE_LOCK_POLL_INTERVAL=0.01)
+class FeedCacheTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        feed_cache.stats.clear()
+        self.reader = create_user("reader")
+        self.author = create_user("author")
+        Follow.objects.create(
+            follower=self.reader.profile, followee=self.author.profile
+        )
+        post = create_posts(self.author, 1, timezone.now())[0]
+        publish_post(post.id)
+        self.post = Post.objects.get(pk=post.pk)
+        self.client = client_for(self.reader)
+
+    def titles(self):
+        response = self.client.get(POSTS_URL)
+        return [post["title"] for post in response.data["results"]]
+
+    def feed_request(self):
+        request = RequestFactory().get(POSTS_URL)
+        request.user = self.reader
+        # Cache the follow graph so threads need no database queries.
+        following_ids(self.reader.id)
+        return request
+
+    def test_second_request_is_a_hit(self):
+        first = self.titles()
+        second = self.titles()
+
+        self.assertEqual(first, second)
+        self.assertEqual(feed_cache.stats["misses"], 1)
+        self.assertEqual(feed_cache.stats["hits"], 1)
+
+    def test_editing_a_post_invalidates_the_feed(self):
+        self.titles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "Edited"
+            self.post.save()
+
+        self.assertEqual(self.titles(), ["Edited"])
+        self.assertEqual(feed_cache.stats["misses"], 2)
+
+    def test_unfollowing_invalidates_the_feed(self):
+        self.titles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                FOLLOW_URL,
+                {"user_id": self.author.id, "action": "unfollow"},
+                format="json",
+            )
+
+        self.assertEqual(self.titles(), [])
+
+    def test_locked_page_serves_the_last_copy(self):
+        request = self.feed_request()
+        cached_feed(request, lambda: Response({"results": ["old"]}))
+        with self.captureOnCommitCallbacks(execute=True):
+            feed_cache.invalidate_readers(self.reader.id)
+        key, _ = _page_keys(request)
+        cache.add(f"{key}:lock", True)
+
+        response = cached_feed(request, self.fail)
+
+        self.assertEqual(response.data, {"results": ["old"]})
+        self.assertEqual(feed_cache.stats["stale"], 1)
+
+    def test_waiting_request_does_not_render(self):
+        request = self.feed_request()
+        rendering, release = Event(), Event()
+        renders = []
+
+        def render():
+            renders.append(True)
+            rendering.set()
+            release.wait(5)
+            return Response({"results": ["page"]})
+
+        holder = Thread(target=cached_feed, args=(request, render))
+        holder.start()
+        rendering.wait(5)
+        waiter = run_in_thread(lambda: cached_feed(request, render))
+        release.set()
+        holder.join()
+
+        self.assertEqual(waiter().data, {"results": ["page"]})
+        self.assertEqual(renders, [True])
+
+    @override_settings(FEED_CACHE_LOCK_WAIT=0.05)
+    def test_only_the_lock_holder_releases_the_lock(self):
+        request = self.feed_request()
+        key, _ = _page_keys(request)
+        held = []
+
+        def render():
+            # Another request gives up waiting and renders on its own.
+            cached_feed(request, lambda: Response({"results": []}))
+            held.append(cache.get(f"{key}:lock"))
+            return Response({"results": []})
+
+        cached_feed(request, render)
+
+        self.assertEqual(held, [True])
+        self.assertIsNone(cache.get(f"{key}:lock"))
+
+
+class ConditionalGetTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user("reader")
+        self.author = create_user("author")
+        Follow.objects.create(
+            follower=self.reader.profile, followee=self.author.profile
+        )
+        post = create_posts(self.author, 1, timezone.now())[0]
+        publish_post(post.id)
+        self.post = Post.objects.get(pk=post.pk)
+        self.detail_url = reverse("social:post-detail", args=[self.post.id])
+        self.client = client_for(self.reader)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["ETag"]
+
+    def test_matching_etag_is_not_modified(self):
+        for url in (POSTS_URL, self.detail_url):
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=self.etag(url)
+                )
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+
+    def test_comment_changes_the_etag(self):
+        etags = {url: self.etag(url) for url in (POSTS_URL, self.detail_url)}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                COMMENTS_URL, {"post": self.post.id, "text": "Nice"}
+            )
+
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_like_changes_the_etag(self):
+        etags = {url: self.etag(url) for url in (POSTS_URL, self.detail_url)}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                LIKES_URL, {"post": self.post.id, "action": "like"}
+            )
+
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_malformed_pk_is_not_found(self):
+        for url in (
+            reverse("social:post-detail", args=["abc"]),
+            reverse("social:profile-detail", args=["abc"]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
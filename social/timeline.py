@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from social.follow_graph import follower_ids, following_ids
+from social.models import Post, TimelineEntry, UserProfile
+
+
+def _bulk_insert(user_post_pairs) -> int:
+    """Insert ``(user_id, post_id)`` pairs in batches, skipping duplicates."""
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post_id)
+        for user_id, post_id in user_post_pairs
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=batch_size, ignore_conflicts=True
+    )
+    return len(entries)
+
+
+def update_fanout_mode(profile) -> bool:
+    """Recompute ``fanout_on_read`` for ``profile`` from its follower count"""
+    fanout_on_read = (
+        profile.followers.count() > settings.TIMELINE_FANOUT_FOLLOWER_LIMIT
+    )
+    if fanout_on_read != profile.fanout_on_read:
+        profile.fanout_on_read = fanout_on_read
+        UserProfile.objects.filter(pk=profile.pk).update(
+            fanout_on_read=fanout_on_read
+        )
+    return fanout_on_read
+
+
+def fan_out_post(post) -> int:
+    """Push a published post into the timelines of its audience"""
+    return fan_out_posts([(post.id, post.owner_id)])
+
+
+def fan_out_posts(post_owner_pairs) -> int:
+    """
+    Push published ``(post_id, owner_id)`` pairs into the timelines of
+    their audience, resolving each author's followers once
+    """
+    posts_by_owner = defaultdict(list)
+    for post_id, owner_id in post_owner_pairs:
+        posts_by_owner[owner_id].append(post_id)
+    profiles = UserProfile.objects.filter(owner_id__in=posts_by_owner)
+
+    pairs = []
+    merged = []
+    for profile in profiles:
+        post_ids = posts_by_owner.pop(profile.owner_id)
+        recipients = [profile.owner_id]
+        if update_fanout_mode(profile):
+            merged.extend(post_ids)
+        else:
+            recipients.extend(follower_ids(profile.owner_id))
+        pairs.extend(
+            (user_id, post_id)
+            for post_id in post_ids
+            for user_id in recipients
+        )
+    if merged:
+        Post.objects.filter(id__in=merged).update(merge_on_read=True)
+    # Authors without a profile only see their own posts.
+    for owner_id, post_ids in posts_by_owner.items():
+        pairs.extend((owner_id, post_id) for post_id in post_ids)
+    return _bulk_insert(pairs)
+
+
+def add_followees(follower_id, followee_ids) -> int:
+    """Backfill recent posts of newly followed users into a timeline"""
+    post_ids = Post.objects.filter(
+        owner_id__in=followee_ids, published=True, merge_on_read=False
+    ).order_by("-created_at", "-id").values_list("id", flat=True)[
+        :settings.TIMELINE_BACKFILL_SIZE
+    ]
+    return _bulk_insert((follower_id, post_id) for post_id in post_ids)
+
+
+def remove_followees(follower_id, followee_ids) -> int:
+    """Drop posts of unfollowed users from a timeline"""
+    deleted, _ = TimelineEntry.objects.filter(
+        user_id=follower_id, post__owner_id__in=followee_ids
+    ).delete()
+    return deleted
+
+
+def rebuild_timeline(user) -> int:
+    """Recreate a user's timeline from scratch"""
+    post_ids = Post.objects.filter(
+        Q(owner_id__in=following_ids(user.id), merge_on_read=False)
+        | Q(owner_id=user.id),
+        published=True,
+    ).order_by("-created_at", "-id").values_list("id", flat=True)[
+        :settings.TIMELINE_BACKFILL_SIZE
+    ]
+    TimelineEntry.objects.filter(user=user).delete()
+    return _bulk_insert((user.id, post_id) for post_id in post_ids)
+
+
+def home_timeline(user, queryset=None):
+    """
+    Return published posts of ``user``'s home timeline: materialized entries
+    merged with the ``merge_on_read`` posts of followed authors
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    timeline_post_ids = TimelineEntry.objects.filter(
+        user=user
+    ).values("post_id")
+    return queryset.filter(
+        Q(id__in=timeline_post_ids)
+        | Q(owner_id__in=following_ids(user.id), merge_on_read=True),
+        published=True,
+    )
+
+
+def trim_timelines() -> int:
+    """Keep only the newest ``TIMELINE_RETENTION_SIZE`` entries per user"""
+    size = settings.TIMELINE_RETENTION_SIZE
+    user_ids = list(
+        TimelineEntry.objects.values("user_id")
+        .annotate(entries=Count("id"))
+        .filter(entries__gt=size)
+        .values_list("user_id", flat=True)
+    )
+    deleted = 0
+    for user_id in user_ids:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        kept = entries.order_by("-post__created_at", "-post_id").values(
+            "id"
+        )[:size]
+        deleted += entries.exclude(id__in=kept).delete()[0]
+    return deleted
@@ -0,0 +1,119 @@
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class RangeConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Range does not continue the received bytes."
+    default_code = "range_conflict"
+
+
+class UploadBusy(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Another request is writing to this upload."
+    default_code = "upload_busy"
+
+
+def session_path(session) -> str:
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.pk}.part")
+
+
+def _lock_path(session) -> str:
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.pk}.lock")
+
+
+@contextmanager
+def locked(session):
+    """
+    Hold an exclusive file lock on the session, or raise ``UploadBusy``
+    if another request holds it
+    """
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    with open(_lock_path(session), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusy()
+        yield
+
+
+def parse_content_range(header, session) -> tuple:
+    """Return the ``(first, last)`` byte offsets of a ``Content-Range``"""
+    match = CONTENT_RANGE_RE.match(header or "")
+    if match is None:
+        raise ValidationError(
+            {"Content-Range": "Expected 'bytes <first>-<last>/<size>'."}
+        )
+    first, last, size = map(int, match.groups())
+    if size != session.size or first > last or last >= size:
+        raise ValidationError(
+            {"Content-Range": f"Invalid range for a {session.size} byte file."}
+        )
+    if last - first + 1 > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise ValidationError(
+            {
+                "Content-Range": "Ranges may not exceed "
+                f"{settings.UPLOAD_CHUNK_MAX_SIZE} bytes."
+            }
+        )
+    if first > session.received:
+        raise RangeConflict(
+            f"Expected a range starting at or before {session.received}."
+        )
+    return first, last
+
+
+def write_range(session, stream, first, last) -> int:
+    """
+    Copy bytes ``first``..``last`` from ``stream`` into the session file
+    and return the new received offset. A short body leaves the file at
+    the previously received offset.
+    """
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    path = session_path(session)
+    remaining = last - first + 1
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as part:
+        part.seek(first)
+        while remaining:
+            buffer = stream.read(min(COPY_BUFFER_SIZE, remaining))
+            if not buffer:
+                break
+            part.write(buffer)
+            remaining -= len(buffer)
+        if remaining:
+            part.truncate(session.received)
+            raise ValidationError(
+                {"Content-Range": "Request body is shorter than the range."}
+            )
+    return max(session.received, last + 1)
+
+
+class SessionFile(File):
+    """The assembled upload, validated and stored from its file on disk"""
+
+    def __init__(self, session):
+        self.path = session_path(session)
+        super().__init__(open(self.path, "rb"), name=session.filename)
+
+    def temporary_file_path(self) -> str:
+        return self.path
+
+
+def discard(session) -> None:
+    """Delete an upload session and its temporary files"""
+    for path in (session_path(session), _lock_path(session)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    session.delete()
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework import routers
 from social.views import (
+    BulkFollowUnfollowView,
     CommentViewSet,
     FollowUnfollowView,
     LikeViewSet,
     PostViewSet,
+    UploadSessionViewSet,
     UserProfileView,
 )
 
@@ -14,6 +16,7 @@ router.register("profiles", UserProfileView, basename="profile")
 router.register("posts", PostViewSet)
 router.register("comments", CommentViewSet)
 router.register("likes", LikeViewSet, basename="like")
+router.register("uploads", UploadSessionViewSet, basename="upload")
 
 
 urlpatterns = [
@@ -23,6 +26,11 @@ urlpatterns = [
         FollowUnfollowView.as_view(),
         name="follow_user"
     ),
+    path(
+        "follow-unfollow/bulk/",
+        BulkFollowUnfollowView.as_view(),
+        name="bulk_follow_user"
+    ),
 ]
 
 
@@ -1,10 +1,14 @@
-from django.db.models import Q
-from rest_framework import viewsets, status
+from django.db import transaction
+from django.conf import settings
+from django.db.models import F, Max, Prefetch, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import mixins, viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiParameter,
@@ -12,27 +16,60 @@ from drf_spectacular.utils import (
 )
 
 from permissions import IsOwnerOrFollower, IsOwnerOrReadOnly
-from social.models import Comment, Like, Post, UserProfile
+from social.conditional import ConditionalGetMixin
+from social.feed_cache import cached_feed
+from social.follow_graph import following_ids
+from social.models import (
+    Comment,
+    Follow,
+    Like,
+    Post,
+    PostHashtag,
+    UploadSession,
+    UserProfile,
+    parse_hashtags,
+)
+from social.pagination import (
+    KeysetCursorPagination,
+    KeysetPaginationMixin,
+    RankedCursorPagination,
+)
+from social.reactions import CLEAR, react
+from social.search import search_posts, substring_search
 from social.serializers import (
+    BulkFollowUnfollowSerializer,
     CommentSerializer,
     CommentListSerializer,
+    CommentPreviewSerializer,
+    FollowerSerializer,
+    FollowingSerializer,
     FollowUnfollowSerializer,
     LikeSerializer,
     PostSerializer,
     PostListSerializer,
+    ReactorSerializer,
+    UploadFinalizeSerializer,
+    UploadSessionSerializer,
     UserProfileSerializer,
     UserProfileListSerializer,
     UserProfileDetailSerializer,
 )
+from social.timeline import home_timeline
+from social.uploads import (
+    RangeConflict,
+    SessionFile,
+    discard,
+    locked,
+    parse_content_range,
+    write_range,
+)
 
 
-class UserProfileView(viewsets.ModelViewSet):
+class UserProfileView(ConditionalGetMixin, viewsets.ModelViewSet):
 
-    queryset = (
-        UserProfile.objects.all()
-        .prefetch_related("followers", "following")
-    )
+    queryset = UserProfile.objects.all().select_related("owner")
     serializer_class = UserProfileSerializer
+    conditional_fields = ("followers_count", "following_count")
     permission_classes = (
         IsOwnerOrFollower,
         IsAuthenticated,
@@ -44,6 +81,14 @@ class UserProfileView(viewsets.ModelViewSet):
         birth_date and location
         """
         queryset = self.queryset
+        if self.action == "list":
+            queryset = queryset.with_follow_counts()
+        if self.action == "retrieve":
+            queryset = (
+                queryset.with_follow_counts()
+                .with_posts_count(self.request.user)
+                .prefetch_related("social_links")
+            )
 
         owner = self.request.query_params.get("owner")
         birth_date = self.request.query_params.get("birth_date")
@@ -56,10 +101,37 @@ class UserProfileView(viewsets.ModelViewSet):
             queryset = queryset.filter(birth_date=birth_date)
 
         if location:
-            queryset = queryset.filter(location__icontains=location)
+            fuzzy = self.request.query_params.get("fuzzy") in ("1", "true")
+            queryset = substring_search(
+                queryset, "location", location, fuzzy=fuzzy
+            )
+            if fuzzy:
+                queryset = queryset.order_by("-rank", "id")
 
         return queryset
 
+    def get_conditional_fields(self):
+        if self.action == "retrieve":
+            return (*self.conditional_fields, "posts_count")
+        return self.conditional_fields
+
+    def get_embedded_validators(self, queryset) -> dict:
+        if self.action != "retrieve":
+            return {}
+        profiles = queryset.values("pk")
+        owners = queryset.values("owner_id")
+        return {
+            "posts": Post.objects.filter(owner_id__in=owners).aggregate(
+                Sum("pk"), Max("updated_at")
+            ),
+            "followers": Follow.objects.filter(
+                followee_id__in=profiles
+            ).aggregate(Sum("pk")),
+            "following": Follow.objects.filter(
+                follower_id__in=profiles
+            ).aggregate(Sum("pk")),
+        }
+
     def get_serializer_class(self):
         serializer = self.serializer_class
         if self.action == "retrieve":
@@ -89,6 +161,12 @@ class UserProfileView(viewsets.ModelViewSet):
                 type=OpenApiTypes.STR,
                 description="Filter by location (ex. ?location=owner_location)"
             ),
+            OpenApiParameter(
+                name="fuzzy",
+                type=OpenApiTypes.BOOL,
+                description="Typo-tolerant location filter ordered by "
+                            "similarity (ex. ?location=Kyev&fuzzy=1)"
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -108,65 +186,137 @@ class UserProfileView(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="followers",
+    )
+    def followers(self, request, pk=None) -> Response:
+        """Paginated followers of a profile, newest first"""
+        profile = self.get_object()
+        edges = Follow.objects.filter(followee=profile).select_related(
+            "follower__owner"
+        )
+        return self._keyset_page(edges, FollowerSerializer)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="following",
+    )
+    def following(self, request, pk=None) -> Response:
+        """Paginated profiles followed by a profile, newest first"""
+        profile = self.get_object()
+        edges = Follow.objects.filter(follower=profile).select_related(
+            "followee__owner"
+        )
+        return self._keyset_page(edges, FollowingSerializer)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="posts",
+    )
+    def posts(self, request, pk=None) -> Response:
+        """Paginated posts of a profile owner, newest first"""
+        profile = self.get_object()
+        posts = Post.objects.filter(owner_id=profile.owner_id).defer(
+            "search_vector"
+        )
+        if request.user.id != profile.owner_id:
+            posts = posts.filter(published=True)
+        return self._keyset_page(posts, PostSerializer)
+
+    def _keyset_page(self, queryset, serializer_class) -> Response:
+        paginator = KeysetCursorPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
 
 class FollowUnfollowView(APIView):
     serializer_class = FollowUnfollowSerializer
 
-    def other_profile(self, pk):
-        return get_object_or_404(UserProfile, id=pk)
-
     def post(self, request) -> Response:
         """Follow or unfollow profiles"""
-        user_id = request.data.get("user_id")
-        action = request.data.get("action")
-
-        data = {"user_id": user_id, "action": action}
         serializer = FollowUnfollowSerializer(
-            data=data,
+            data=request.data,
             context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        print(serializer.data)
+        result = serializer.save()
         return Response(
             {
-                "message": f"Successfully {action}ed "
-                f"{self.other_profile(user_id)}"
+                "message": f"Successfully {result['action']}ed "
+                f"{result['username']}",
+                **result,
             },
             status=status.HTTP_200_OK
         )
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().select_related("owner")
+class BulkFollowUnfollowView(APIView):
+    serializer_class = BulkFollowUnfollowSerializer
+
+    def post(self, request) -> Response:
+        """Follow or unfollow several users in one request"""
+        serializer = BulkFollowUnfollowSerializer(
+            data=request.data,
+            context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response(
+            {
+                "action": serializer.validated_data["action"],
+                "results": results,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class PostViewSet(
+    ConditionalGetMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
+    queryset = (
+        Post.objects.all()
+        .select_related("owner")
+        .defer("search_vector")
+        .order_by("-created_at", "-id")
+    )
     serializer_class = PostSerializer
     permission_classes = (
         IsOwnerOrReadOnly,
         IsAuthenticated,
     )
+    conditional_fields = ("like_count", "dislike_count", "comment_count")
 
     def get_queryset(self):
         """
         Retrieve posts filtered by following users, with search by hashtags
         """
-        queryset = self.queryset.filter(published=True)
         user = self.request.user
 
-        following_users = user.profile.following.values_list(
-            "owner", flat=True
-        )
-        queryset = queryset.filter(
-            Q(owner__in=following_users)
-            | Q(owner=user)
-        )
+        if self.action in ("list", "search"):
+            queryset = home_timeline(user, self.queryset)
+        else:
+            # Owners can still reach their scheduled posts to reschedule
+            queryset = self.queryset.filter(
+                Q(owner_id__in=following_ids(user.id), published=True)
+                | Q(owner_id=user.id)
+            )
 
         hashtag_params = self.request.query_params.get("hashtag")
         created_at = self.request.query_params.get("created_at")
         updated_at = self.request.query_params.get("updated_at")
 
         if hashtag_params:
-            hashtags_params = hashtag_params.split(",")
-            queryset = queryset.filter(hashtags__in=hashtags_params)
+            tagged_posts = PostHashtag.objects.filter(
+                hashtag__name__in=parse_hashtags(hashtag_params)
+            ).values("post_id")
+            queryset = queryset.filter(id__in=tagged_posts)
 
         if created_at:
             queryset = queryset.filter(created_at__date=created_at)
@@ -174,12 +324,42 @@ class PostViewSet(viewsets.ModelViewSet):
         if updated_at:
             queryset = queryset.filter(updated_at__date=updated_at)
 
-        return queryset.distinct()
+        if self.action in ("list", "retrieve", "search"):
+            latest_comments = Comment.objects.select_related(
+                "user"
+            ).order_by("-created_at", "-id")
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "comments",
+                    queryset=latest_comments[
+                        :settings.FEED_COMMENT_PREVIEW_SIZE
+                    ],
+                    to_attr="latest_comments",
+                )
+            )
+
+        return queryset
+
+    def get_embedded_validators(self, queryset) -> dict:
+        return Comment.objects.filter(
+            post_id__in=queryset.values("pk")
+        ).aggregate(
+            comments=Sum("pk"), comments_updated_at=Max("updated_at")
+        )
+
+    def get_pagination_class(self):
+        if self.action == "search":
+            return RankedCursorPagination
+        return super().get_pagination_class()
 
     def get_serializer_class(self):
         serializer = self.serializer_class
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "search"):
             serializer = PostListSerializer
+        if self.action == "comments":
+            serializer = CommentPreviewSerializer
+        if self.action == "reactions":
+            serializer = ReactorSerializer
         return serializer
 
     def perform_create(self, serializer):
@@ -208,22 +388,104 @@ class PostViewSet(viewsets.ModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         """Filtering by hashtag, created_at, updated_at"""
-        return super().list(request, *args, **kwargs)
+        render = super().list
+        return cached_feed(request, lambda: render(request, *args, **kwargs))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="Search in post title and text (ex. ?q=django)",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="search",
+    )
+    def search(self, request) -> Response:
+        """Full-text search of posts visible in the feed, best match first"""
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": "This query parameter is required."})
 
+        queryset = search_posts(self.get_queryset(), text)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().select_related()
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="comments",
+    )
+    def comments(self, request, pk=None) -> Response:
+        """Paginated comments of a post, newest first"""
+        post = self.get_object()
+        queryset = post.comments.select_related("user").order_by(
+            "-created_at", "-id"
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="action",
+                type=OpenApiTypes.STR,
+                enum=Like.ActionChoices.values,
+                description="Filter reactors by reaction (ex. ?action=like)",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="reactions",
+    )
+    def reactions(self, request, pk=None) -> Response:
+        """Reaction counts of a post and its reactors, newest first"""
+        post = self.get_object()
+        queryset = post.likes.select_related("user")
+        reaction = request.query_params.get("action")
+        if reaction:
+            if reaction not in Like.ActionChoices.values:
+                raise ValidationError(
+                    {"action": f"Must be one of {Like.ActionChoices.values}."}
+                )
+            queryset = queryset.filter(action=reaction)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data = {
+            "counts": {
+                Like.ActionChoices.LIKE.value: post.like_count,
+                Like.ActionChoices.DISLIKE.value: post.dislike_count,
+            },
+            **response.data,
+        }
+        return response
+
+
+class CommentViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = (
+        Comment.objects.all()
+        .select_related()
+        .order_by("-created_at", "-id")
+    )
     serializer_class = CommentSerializer
 
     def get_queryset(self):
         queryset = self.queryset
         user = self.request.user
-        following_users = user.profile.following.values_list(
-            "owner", flat=True
-        )
 
         queryset = queryset.filter(
-            Q(user__in=following_users) | Q(user=user)
+            user_id__in=following_ids(user.id) | {user.id}
         )
 
         post_param = self.request.query_params.get("post")
@@ -233,18 +495,52 @@ class CommentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(post__title=post_param)
 
         if text_param:
-            queryset = queryset.filter(text__icontains=text_param)
+            queryset = substring_search(
+                queryset, "text", text_param, fuzzy=self._is_fuzzy()
+            )
 
         return queryset
 
+    def _is_fuzzy(self) -> bool:
+        return self.request.query_params.get("fuzzy") in ("1", "true")
+
+    def get_pagination_class(self):
+        if self.action == "list" and self._is_fuzzy():
+            return RankedCursorPagination
+        return super().get_pagination_class()
+
     def get_serializer_class(self):
         serializer = self.serializer_class
         if self.action == "list":
             serializer = CommentListSerializer
         return serializer
 
+    @transaction.atomic()
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        comment = serializer.save(user=self.request.user)
+        Post.objects.filter(pk=comment.post_id).update(
+            comment_count=F("comment_count") + 1
+        )
+
+    @transaction.atomic()
+    def perform_update(self, serializer):
+        old_post_id = serializer.instance.post_id
+        comment = serializer.save()
+        if comment.post_id != old_post_id:
+            Post.objects.filter(pk=old_post_id).update(
+                comment_count=Greatest(F("comment_count") - 1, 0)
+            )
+            Post.objects.filter(pk=comment.post_id).update(
+                comment_count=F("comment_count") + 1
+            )
+
+    @transaction.atomic()
+    def perform_destroy(self, instance):
+        post_id = instance.post_id
+        instance.delete()
+        Post.objects.filter(pk=post_id).update(
+            comment_count=Greatest(F("comment_count") - 1, 0)
+        )
 
     @extend_schema(
         parameters=[
@@ -264,6 +560,14 @@ class CommentViewSet(viewsets.ModelViewSet):
                     "(ex. ?text=example_text)"
                 ),
             ),
+            OpenApiParameter(
+                name="fuzzy",
+                type=OpenApiTypes.BOOL,
+                description=(
+                    "Typo-tolerant text filter ordered by similarity "
+                    "(ex. ?text=exmaple&fuzzy=1)"
+                ),
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -271,6 +575,145 @@ class CommentViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class LikeViewSet(viewsets.ModelViewSet):
-    queryset = Like.objects.all()
+class LikeViewSet(
+    KeysetPaginationMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = Like.objects.all().order_by("-created_at", "-id")
     serializer_class = LikeSerializer
+
+    def get_queryset(self):
+        """Reactions of the requesting user, optionally for one post"""
+        queryset = self.queryset.filter(user=self.request.user)
+
+        post_id = self.request.query_params.get("post")
+        if post_id:
+            if not post_id.isdigit():
+                raise ValidationError({"post": "A valid integer is required."})
+            queryset = queryset.filter(post_id=post_id)
+
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="post",
+                type=OpenApiTypes.INT,
+                description="Filter by post id (ex. ?post=1)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        """Reactions of the requesting user, filtering by post"""
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs) -> Response:
+        """Like, dislike or clear the reaction to a post"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reaction = serializer.save()
+        return Response(reaction, status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance) -> None:
+        react(instance.user_id, instance.post_id, CLEAR)
+
+
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable image uploads: create a session, PUT byte ranges with a
+    Content-Range header, then finalize it onto a post or profile
+    """
+
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance) -> None:
+        with locked(instance):
+            discard(instance)
+
+    def update(self, request, *args, **kwargs) -> Response:
+        """Append a byte range sent as the raw request body"""
+        session = self.get_object()
+        # The file lock serializes writers without holding a transaction
+        # open while a slow client streams the range.
+        with locked(session):
+            session = self.get_object()
+            first, last = parse_content_range(
+                request.headers.get("Content-Range"), session
+            )
+            content_length = request.headers.get("Content-Length")
+            if content_length != str(last - first + 1):
+                raise ValidationError(
+                    {"Content-Length": "Must equal the length of the range."}
+                )
+
+            received = write_range(session, request.stream, first, last)
+            # Only advance from the offset the range was checked against.
+            updated = UploadSession.objects.filter(
+                pk=session.pk, received=session.received
+            ).update(received=received, updated_at=timezone.now())
+            if not updated:
+                raise RangeConflict(
+                    "The upload changed while the range was written."
+                )
+            session.received = received
+        return Response(self.get_serializer(session).data)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="finalize",
+    )
+    def finalize(self, request, pk=None) -> Response:
+        """Attach a completed upload to a post image or profile picture"""
+        with locked(self.get_object()):
+            return self._finalize(request)
+
+    def _finalize(self, request) -> Response:
+        session = self.get_object()
+        if session.received != session.size:
+            raise ValidationError(
+                {
+                    "received": f"Only {session.received} of {session.size} "
+                    "bytes have been uploaded."
+                }
+            )
+        target = UploadFinalizeSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        target.is_valid(raise_exception=True)
+
+        if "post" in target.validated_data:
+            instance = target.validated_data["post"]
+            serializer_class, field_name = PostSerializer, "image"
+        else:
+            instance = target.validated_data["profile"]
+            serializer_class, field_name = (
+                UserProfileSerializer, "profile_picture"
+            )
+        with SessionFile(session) as upload:
+            serializer = serializer_class(
+                instance,
+                data={field_name: upload},
+                partial=True,
+                context=self.get_serializer_context(),
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        discard(session)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,12 +31,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# True while ``manage.py test`` runs; tests always run with DEBUG off.
+TESTING = sys.argv[1:2] == ["test"]
+
 ALLOWED_HOSTS = []
 
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# The toolbar is never shown with DEBUG off, which tests always run with.
+DEBUG_TOOLBAR_CONFIG = {"IS_RUNNING_TESTS": False}
+
 
 # Application definition
 
@@ -46,6 +53,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_celery_beat",
     "rest_framework.authtoken",
     "rest_framework",
@@ -102,6 +110,39 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Revoked auth tokens live in a dedicated Redis configured with
+# maxmemory-policy noeviction. Only DEBUG and test runs fall back to a
+# per-process local-memory cache; anywhere else the user.E001 system
+# check stops the project without TOKEN_REVOCATION_REDIS_URL.
+if os.getenv("TOKEN_REVOCATION_REDIS_URL"):
+    CACHES["token_revocation"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("TOKEN_REVOCATION_REDIS_URL"),
+    }
+elif DEBUG or TESTING:
+    CACHES["token_revocation"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "token-revocation",
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -145,6 +186,34 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Media files are handed to the web server when a backend is set:
+# "nginx" (X-Accel-Redirect to MEDIA_SENDFILE_PREFIX, an internal location
+# aliased to MEDIA_ROOT) or "apache" (X-Sendfile); otherwise Django streams
+# them. Content-addressed files are cached for MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_SENDFILE_BACKEND = os.getenv("MEDIA_SENDFILE_BACKEND", "")
+MEDIA_SENDFILE_PREFIX = os.getenv("MEDIA_SENDFILE_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Image renditions: longest edge in pixels per size, output formats and
+# encoder quality
+IMAGE_RENDITION_SIZES = {
+    "thumbnail": 160,
+    "medium": 640,
+    "large": 1280,
+}
+IMAGE_RENDITION_FORMATS = ("webp", "jpeg")
+IMAGE_RENDITION_QUALITY = 80
+
+# Resumable uploads: directory of partial files (shared by all web
+# workers), maximum file and range sizes in bytes and the idle time in
+# seconds after which unfinished sessions are reaped
+UPLOAD_SESSION_DIR = os.getenv(
+    "UPLOAD_SESSION_DIR", os.path.join(BASE_DIR, "uploads")
+)
+UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -155,11 +224,17 @@ AUTH_USER_MODEL = "user.User"
 
 LOGIN_REDIRECT_URL = "/api/user/manage/"
 
+# Signed bearer tokens: signing key and algorithm, and the lifetimes in
+# seconds of access tokens and of the refresh tokens exchanged for them
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET") or SECRET_KEY
+AUTH_TOKEN_ALGORITHM = "HS256"
+AUTH_TOKEN_ACCESS_TTL = 15 * 60
+AUTH_TOKEN_REFRESH_TTL = 7 * 24 * 60 * 60
+
 REST_FRAMEWORK = {
     "DATETIME_FORMAT": "%Y-%m-%d %H:%M",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
-        "rest_framework.authentication.BasicAuthentication",
+        "user.authentication.SignedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -171,6 +246,48 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 2
 }
 
+# Keyset (cursor) pagination of posts, comments and likes
+CURSOR_PAGE_SIZE = 20
+CURSOR_MAX_PAGE_SIZE = 100
+
+# Number of latest comments embedded into each post of the feed
+FEED_COMMENT_PREVIEW_SIZE = 3
+
+# Number of followers, following and post titles embedded in profile detail
+PROFILE_PREVIEW_SIZE = 10
+
+# PostgreSQL text search configuration used for post search
+SEARCH_CONFIG = "english"
+
+
+# Home timeline
+# Accounts with more followers than this are merged into feeds on read
+TIMELINE_FANOUT_FOLLOWER_LIMIT = 10_000
+# Most recent posts copied into a timeline on follow or rebuild
+TIMELINE_BACKFILL_SIZE = 200
+TIMELINE_BATCH_SIZE = 1_000
+# Newest entries kept per timeline by the trim_timelines task
+TIMELINE_RETENTION_SIZE = 1_000
+
+# Scheduled posts published per locked chunk by the publishing task
+PUBLISH_BATCH_SIZE = 500
+
+# Seconds a cached following/followers id set is kept
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+
+# Rendered feed pages: seconds a page is cached, how long the last copy is
+# kept to serve while another request re-renders it, the re-render lock,
+# and how long (re-reading every poll interval) a request without a last
+# copy waits for another's render before rendering itself
+FEED_CACHE_TIMEOUT = 5 * 60
+FEED_CACHE_STALE_TIMEOUT = 60 * 60
+FEED_CACHE_LOCK_TIMEOUT = 10
+FEED_CACHE_LOCK_WAIT = 2
+FEED_CACHE_LOCK_POLL_INTERVAL = 0.05
+
+# Maximum number of targets accepted by one bulk follow/unfollow request
+BULK_FOLLOW_MAX_SIZE = 100
+
 
 # Celery Configuration Options
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.db.models import DEFERRED
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework import authentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from user.tokens import ACCESS, USER_CLAIMS, decode_token
+
+
+def user_from_claims(payload):
+    """
+    Build the user of an access token without a query; fields missing from
+    the token are deferred and loaded on first access
+    """
+    User = get_user_model()
+    values = {"id": int(payload["sub"])}
+    values.update((field, payload.get(field)) for field in USER_CLAIMS)
+    fields = User._meta.concrete_fields
+    return User.from_db(
+        router.db_for_read(User),
+        [field.attname for field in fields if field.attname in values],
+        [values.get(field.attname, DEFERRED) for field in fields],
+    )
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """Authenticate ``Authorization: Bearer <access token>`` requests"""
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed(
+                "Invalid token header. Expected 'Bearer <token>'."
+            )
+        try:
+            token = header[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token header.")
+
+        payload = decode_token(token, ACCESS)
+        if not payload.get("is_active", False):
+            raise AuthenticationFailed("User inactive or deleted.")
+        return user_from_claims(payload), payload
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
+
+
+class SignedTokenAuthenticationScheme(OpenApiAuthenticationExtension):
+    target_class = "user.authentication.SignedTokenAuthentication"
+    name = "bearerAuth"
+
+    def get_security_definition(self, auto_schema):
+        return {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
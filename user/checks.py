@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, Warning
+
+from user.tokens import REVOCATION_CACHE
+
+REDIS_BACKEND = "django.core.cache.backends.redis.RedisCache"
+
+
+def check_token_revocation_cache(app_configs, **kwargs) -> list:
+    """Revoked tokens need a shared cache that never drops entries"""
+    cache = settings.CACHES.get(REVOCATION_CACHE)
+    if cache is None:
+        return [
+            Error(
+                f"CACHES[{REVOCATION_CACHE!r}] is not configured.",
+                hint="Set TOKEN_REVOCATION_REDIS_URL to a Redis instance "
+                "with maxmemory-policy noeviction.",
+                id="user.E001",
+            )
+        ]
+    if cache["BACKEND"] == REDIS_BACKEND:
+        return []
+    message = f"CACHES[{REVOCATION_CACHE!r}] does not use {REDIS_BACKEND}."
+    hint = "Per-process or evicting caches lose revocations."
+    # Local caches are fine for test runs and, with a warning, development.
+    if settings.TESTING:
+        return []
+    if settings.DEBUG:
+        return [Warning(message, hint=hint, id="user.W001")]
+    return [Error(message, hint=hint, id="user.E002")]
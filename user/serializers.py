@@ -1,12 +1,13 @@
 from django.db import transaction
 from rest_framework import serializers
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 
 from django.utils.translation import gettext as _
 
 from social.models import UserProfile
 from social.serializers import UserProfileSerializer
+from user.tokens import REFRESH, decode_token, issue_tokens, revoke_token
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -51,7 +52,6 @@ class UserSerializer(serializers.ModelSerializer):
         """Create User with encrypted password"""
         profile_data = validated_data.pop("profile")
         user = get_user_model().objects.create_user(**validated_data)
-        Token.objects.create(user=user)
         UserProfile.objects.create(owner=user, **profile_data)
         return user
 
@@ -114,3 +114,39 @@ class UserLoginSerializer(serializers.ModelSerializer):
                 "style": {"input_type": "password"},
             }
         }
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value) -> dict:
+        return decode_token(value, REFRESH)
+
+    def save(self, **kwargs) -> dict:
+        """
+        Revoke the refresh token and issue a new pair for its user; a
+        refresh token can only be used once
+        """
+        payload = self.validated_data["refresh"]
+        if not revoke_token(payload):
+            raise AuthenticationFailed(
+                "Token has been revoked.", "token_revoked"
+            )
+        user = get_user_model().objects.filter(
+            pk=payload["sub"], is_active=True
+        ).first()
+        if user is None:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return issue_tokens(user)
+
+
+class UserLogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True, required=False)
+
+    def validate_refresh(self, value) -> dict:
+        payload = decode_token(value, REFRESH)
+        if payload["sub"] != str(self.context["request"].user.pk):
+            raise serializers.ValidationError(
+                "Token does not belong to the requesting user."
+            )
+        return payload
@@ -1,3 +1,122 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from user.checks import REDIS_BACKEND, check_token_revocation_cache
+from user.tokens import ACCESS, REVOCATION_CACHE, decode_token, issue_tokens
+
+LOGIN_URL = reverse("user:login")
+REFRESH_URL = reverse("user:token_refresh")
+LOGOUT_URL = reverse("user:logout")
+MANAGE_URL = reverse("user:manage")
+
+
+def caches_with(revocation=None) -> dict:
+    caches = {
+        alias: config
+        for alias, config in settings.CACHES.items()
+        if alias != REVOCATION_CACHE
+    }
+    if revocation:
+        caches[REVOCATION_CACHE] = revocation
+    return caches
+
+
+class TokenRevocationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password", username="user"
+        )
+        self.client = APIClient()
+        self.tokens = self.client.post(
+            LOGIN_URL, {"email": "user@example.com", "password": "password"}
+        ).data
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        self.authenticate(self.tokens["access"])
+
+        response = self.client.post(
+            LOGOUT_URL, {"refresh": self.tokens["refresh"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(MANAGE_URL)
+        self.assertEqual(response.data["detail"].code, "token_revoked")
+        response = APIClient().post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        self.assertEqual(response.data["detail"].code, "token_revoked")
+
+    def test_logout_rejects_refresh_tokens_of_other_users(self):
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="password", username="other"
+        )
+        refresh = issue_tokens(other)["refresh"]
+        self.authenticate(self.tokens["access"])
+
+        response = self.client.post(LOGOUT_URL, {"refresh": refresh})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = APIClient().post(REFRESH_URL, {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_is_single_use(self):
+        first = APIClient().post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+        second = APIClient().post(
+            REFRESH_URL, {"refresh": self.tokens["refresh"]}
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.authenticate(first.data["access"])
+        self.assertEqual(
+            self.client.get(MANAGE_URL).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(second.data["detail"].code, "token_revoked")
+
+    def test_decoding_fails_without_revocation_cache(self):
+        access = issue_tokens(self.user)["access"]
+
+        with override_settings(CACHES=caches_with()):
+            with self.assertRaises(ImproperlyConfigured):
+                decode_token(access, ACCESS)
+
+
+class TokenRevocationCacheCheckTests(SimpleTestCase):
+
+    locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+    def check_ids(self, revocation, debug=False, testing=False):
+        with override_settings(
+            CACHES=caches_with(revocation), DEBUG=debug, TESTING=testing
+        ):
+            return [error.id for error in check_token_revocation_cache(None)]
+
+    def test_missing_cache(self):
+        self.assertEqual(self.check_ids(None), ["user.E001"])
+        self.assertEqual(self.check_ids(None, testing=True), ["user.E001"])
+
+    def test_local_memory_cache_in_production(self):
+        self.assertEqual(self.check_ids(self.locmem), ["user.E002"])
+
+    def test_local_memory_cache_in_development(self):
+        self.assertEqual(
+            self.check_ids(self.locmem, debug=True), ["user.W001"]
+        )
+
+    def test_local_memory_cache_in_tests(self):
+        self.assertEqual(self.check_ids(self.locmem, testing=True), [])
+
+    def test_redis_cache(self):
+        redis = {"BACKEND": REDIS_BACKEND, "LOCATION": "redis://redis:6379"}
+
+        self.assertEqual(self.check_ids(redis), [])
@@ -0,0 +1,100 @@
+import time
+from uuid import uuid4
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import AuthenticationFailed
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+USER_CLAIMS = ("email", "username", "is_active", "is_staff", "is_superuser")
+REVOCATION_CACHE = "token_revocation"
+
+
+def _revocations():
+    # Never fall back to another cache: evicted revocations would
+    # silently make revoked tokens valid again.
+    if REVOCATION_CACHE not in settings.CACHES:
+        raise ImproperlyConfigured(
+            f"CACHES[{REVOCATION_CACHE!r}] is not configured; set "
+            "TOKEN_REVOCATION_REDIS_URL."
+        )
+    return caches[REVOCATION_CACHE]
+
+
+def _revoked_key(jti) -> str:
+    return f"auth:revoked:{jti}"
+
+
+def _encode(payload, token_type, ttl) -> str:
+    now = int(time.time())
+    payload = {
+        **payload,
+        "type": token_type,
+        "jti": uuid4().hex,
+        "iat": now,
+        "exp": now + ttl,
+    }
+    return jwt.encode(
+        payload,
+        settings.AUTH_TOKEN_SECRET,
+        algorithm=settings.AUTH_TOKEN_ALGORITHM,
+    )
+
+
+def issue_tokens(user) -> dict:
+    """Return a new access/refresh token pair for ``user``"""
+    claims = {field: getattr(user, field) for field in USER_CLAIMS}
+    return {
+        "access": _encode(
+            {"sub": str(user.pk), **claims},
+            ACCESS,
+            settings.AUTH_TOKEN_ACCESS_TTL,
+        ),
+        "refresh": _encode(
+            {"sub": str(user.pk)}, REFRESH, settings.AUTH_TOKEN_REFRESH_TTL
+        ),
+        "token_type": "Bearer",
+        "expires_in": settings.AUTH_TOKEN_ACCESS_TTL,
+    }
+
+
+def decode_token(token, token_type) -> dict:
+    """
+    Return the payload of a valid, unexpired and unrevoked ``token`` of
+    ``token_type`` or raise ``AuthenticationFailed``
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.AUTH_TOKEN_SECRET,
+            algorithms=[settings.AUTH_TOKEN_ALGORITHM],
+            options={"require": ["sub", "type", "jti", "exp"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationFailed("Token has expired.", "token_expired")
+    except jwt.InvalidTokenError:
+        raise AuthenticationFailed("Invalid token.", "token_invalid")
+    if payload["type"] != token_type:
+        raise AuthenticationFailed("Invalid token type.", "token_invalid")
+    if _revocations().get(_revoked_key(payload["jti"])):
+        raise AuthenticationFailed("Token has been revoked.", "token_revoked")
+    return payload
+
+
+def revoke_token(payload) -> bool:
+    """
+    Add the token of ``payload`` to the revocation list and return whether
+    it was not revoked before
+    """
+    remaining = payload["exp"] - int(time.time())
+    if remaining <= 0:
+        return False
+    # Revocations expire with the token, so the list never outgrows the
+    # live tokens.
+    return _revocations().add(
+        _revoked_key(payload["jti"]), True, timeout=remaining
+    )
@@ -4,6 +4,7 @@ from user.views import (
     CreateUserView,
     ManageUserView,
     LoginUserView,
+    TokenRefreshView,
     UserLogoutAPIView
 )
 
@@ -11,6 +12,7 @@ from user.views import (
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="register"),
     path("login/", LoginUserView.as_view(), name="login"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("logout/", UserLogoutAPIView.as_view(), name="logout"),
     path("manage/", ManageUserView.as_view(), name="manage"),
 ]
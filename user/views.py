@@ -1,17 +1,18 @@
 from rest_framework import generics, status
-from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import authenticate, get_user_model, login, logout
 
 from user.serializers import (
+    TokenRefreshSerializer,
     UserDetailSerializer,
     UserLoginSerializer,
+    UserLogoutSerializer,
     UserSerializer
 )
+from user.tokens import issue_tokens, revoke_token
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -34,8 +35,7 @@ class LoginUserView(ObtainAuthToken):
 
         if user:
             login(request, user)
-            token, created = Token.objects.get_or_create(user=user)
-            return Response({"token": token.key}, status=status.HTTP_200_OK)
+            return Response(issue_tokens(user), status=status.HTTP_200_OK)
 
         return Response(
             {"error": "Invalid credentials"},
@@ -43,11 +43,32 @@ class LoginUserView(ObtainAuthToken):
         )
 
 
-class UserLogoutAPIView(APIView):
+class TokenRefreshView(generics.GenericAPIView):
+    """Exchange a refresh token for a new access/refresh token pair"""
+
+    serializer_class = TokenRefreshSerializer
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request) -> Response:
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+
+class UserLogoutAPIView(generics.GenericAPIView):
+    """Revoke the access token (and a given refresh token) of the request"""
+
+    serializer_class = UserLogoutSerializer
 
     def post(self, request):
-        token = Token.objects.get(user=request.user)
-        token.delete()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if isinstance(request.auth, dict):
+            revoke_token(request.auth)
+        refresh = serializer.validated_data.get("refresh")
+        if refresh:
+            revoke_token(refresh)
         logout(request)
         return Response(
             {"success": True, "detail": "Logged out!"},
@@ -59,7 +80,8 @@ class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from token claims; load the full row.
+        return get_user_model().objects.get(pk=self.request.user.pk)
 
     def get_serializer_class(self):
         serializer = self.serializer_class